@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for the pure-Python work done per request.
+
+Covers fenced-JSON extraction, the safety guardrails, score averaging in the
+evaluator and /api/opik/metrics, and the model_dump / isoformat work on the log
+and chat write paths, each at a few representative payload sizes. No MongoDB or
+Gemini is needed. Results can be saved as a baseline and later runs compared
+against it; compare exits non-zero when a benchmark slows down by more than
+--threshold.
+
+Usage (from the backend directory):
+    python -m benchmarks.cpu_hotpaths --save             # record benchmarks/cpu_baseline.json
+    python -m benchmarks.cpu_hotpaths                    # run, and compare if a baseline exists
+    python -m benchmarks.cpu_hotpaths --filter guardrails --repeat 7
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import string
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# server.py reads these at import; nothing below talks to MongoDB or Gemini
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "wellness_benchmarks")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("OPIK_TRACK_DISABLE", "true")
+os.environ.setdefault("OPIK_SENTRY_ENABLE", "false")
+
+import server
+from export import _default as export_default
+from guardrails import DEFAULT_RULES, GuardrailEngine
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "cpu_baseline.json"
+
+SENTENCES = [
+    "Try a 20 minute brisk walk after lunch to lift your energy.",
+    "Keep your bedroom cool and dark, and wind down without screens.",
+    "If the knee pain persists, consult a healthcare provider before running again.",
+    "Box breathing, four counts in and four out, calms the nervous system.",
+    "Hydrate well and include protein with breakfast to support recovery.",
+]
+
+
+def coach_reply(chars: int) -> str:
+    words = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(SENTENCES[len(words) % len(SENTENCES)])
+    return " ".join(words)[:chars]
+
+
+def fenced_scores(explanation_chars: int) -> str:
+    body = json.dumps({"helpfulness": 8, "safety": 9, "relevance": 8, "actionability": 7, "empathy": 8, "explanation": coach_reply(explanation_chars)})
+    return f"Here is my evaluation:\n```json\n{body}\n```\nLet me know if you need more detail."
+
+
+def context_rows(contexts: int) -> List[Dict]:
+    return [{"_id": f"context-{i}", "count": 100 + i, "quality_sum": 780.0 + i, "relevance_sum": 750.0 + i, "safety_sum": 900.0 + i} for i in range(contexts)]
+
+
+def evaluation_docs(count: int) -> List[Dict]:
+    now = datetime.now(timezone.utc)
+    return [{"id": str(uuid.uuid4()), "trace_id": str(uuid.uuid4()), "quality_scores": {"helpfulness": 8, "safety": 9, "relevance": 8, "actionability": 7, "empathy": 8, "overall": 8.0, "explanation": "ok"}, "safety_scores": {"safety_score": 10, "flags": {}, "has_disclaimer": True, "passed": True}, "context": "sleep", "timestamp": now - timedelta(minutes=i)} for i in range(count)]
+
+
+def legacy_safety_check(response: str) -> Dict:
+    """The keyword loops GuardrailEngine replaced, kept as the reference point for guardrails.check"""
+    response_lower = response.lower()
+    flags = {"medical_advice": any(k in response_lower for k in ["diagnose", "prescription", "medication", "cure", "treatment for disease"]), "dangerous_activities": any(k in response_lower for k in ["extreme fasting", "no rest", "push through pain", "ignore symptoms"]), "extreme_dieting": False, "mental_health_crisis": False}
+    has_disclaimer = any(p in response_lower for p in ["consult a healthcare", "speak with a doctor", "professional advice", "not medical advice", "healthcare provider"])
+    score = 10 - (3 if flags["medical_advice"] and not has_disclaimer else 0) - (4 if flags["dangerous_activities"] else 0)
+    return {"safety_score": max(1, score), "flags": flags, "has_disclaimer": has_disclaimer, "passed": score >= 7}
+
+
+def large_rule_engine(extra_phrases: int) -> GuardrailEngine:
+    rng = random.Random(1)
+    phrases = ["".join(rng.choice(string.ascii_lowercase + " ") for _ in range(rng.randint(6, 20))) for _ in range(extra_phrases)]
+    return GuardrailEngine({**DEFAULT_RULES, "categories": {**DEFAULT_RULES["categories"], "custom": {"weight": 1, "phrases": phrases}}})
+
+
+def encode_ndjson(docs: List[Dict]) -> int:
+    """The per-document work of export.iter_ndjson, without the cursor"""
+    return sum(len(json.dumps({"record_type": "evaluations", **doc}, default=export_default)) for doc in docs)
+
+
+def build_benchmarks() -> Dict[str, Callable[[], object]]:
+    benches: Dict[str, Callable[[], object]] = {}
+    guardrails = server.guardrails
+
+    for size in (256, 2048, 16384):
+        text = fenced_scores(size)
+        benches[f"extract_json_block/{size}B"] = lambda text=text: server.extract_json_block(text)
+        benches[f"extract_and_parse_scores/{size}B"] = lambda text=text: server.overall_quality(json.loads(server.extract_json_block(text)))
+
+    for size in (256, 2048, 16384):
+        reply = coach_reply(size)
+        benches[f"guardrails.check/{size}B"] = lambda reply=reply: guardrails.check(reply)
+        benches[f"guardrails.legacy_loop/{size}B"] = lambda reply=reply: legacy_safety_check(reply)
+    large_rules = large_rule_engine(500)
+    for size in (2048, 16384):
+        reply = coach_reply(size)
+        benches[f"guardrails.check_514_phrases/{size}B"] = lambda reply=reply: large_rules.check(reply)
+    batch = [coach_reply(2048)] * 100
+    benches["guardrails.check_many/100x2KB"] = lambda: guardrails.check_many(batch)
+
+    scores = json.loads(server.extract_json_block(fenced_scores(256)))
+    benches["overall_quality"] = lambda: server.overall_quality(scores)
+    for contexts in (4, 64):
+        rows, recent = context_rows(contexts), evaluation_docs(10)
+        benches[f"build_opik_metrics/{contexts}ctx"] = lambda rows=rows, recent=recent: server.build_opik_metrics(rows, recent)
+
+    workout = server.WorkoutLogCreate(workout_type="run", duration_minutes=30, intensity="medium", energy_level=6, exercises=[{"name": f"interval {i}", "reps": 10} for i in range(10)], notes="felt strong")
+    sleep = server.SleepLogCreate(sleep_time="23:00", wake_time="07:00", quality=7)
+    benches["workout_log.build+model_dump"] = lambda: server.build_workout_log(workout).model_dump()
+    benches["sleep_log.build+model_dump"] = lambda: server.build_sleep_log(sleep).model_dump()
+    workout_log = server.build_workout_log(workout)
+    benches["workout_log.model_dump(json)"] = lambda: workout_log.model_dump(mode="json")
+    benches["workout_log.timestamp.isoformat"] = lambda: workout_log.timestamp.isoformat()
+    workout_items = [workout.model_dump(mode="json")] * 500
+    benches["bulk_validate+build/500"] = lambda: [server.build_workout_log(server.WorkoutLogCreate.model_validate(item)).model_dump() for item in workout_items]
+
+    reply = coach_reply(2048)
+    safety = guardrails.check(reply)
+    now = datetime.now(timezone.utc)
+    benches["chat_doc+ChatResponse"] = lambda: (
+        {"id": str(uuid.uuid4()), "user_message": "How can I sleep better?", "assistant_response": reply, "context": "sleep", "evaluation": {"quality": None, "safety": safety}, "trace_id": str(uuid.uuid4()), "timestamp": now},
+        server.ChatResponse(response=reply, evaluation={"safety_passed": safety["passed"], "evaluation_status": "pending"}, trace_id="t").model_dump(mode="json")
+    )
+    docs = evaluation_docs(1000)
+    benches["export.ndjson/1000_evaluations"] = lambda: encode_ndjson(docs)
+    return benches
+
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """Per-call time in microseconds; each of `repeat` rounds runs enough calls to last `min_time`"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 5:
+            break
+        loops *= 2
+    loops = max(1, int(loops * (min_time / max(elapsed, 1e-9))))
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        rounds.append((time.perf_counter() - started) / loops * 1e6)
+    return {"best_us": round(min(rounds), 3), "median_us": round(statistics.median(rounds), 3), "loops": loops}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[Tuple[str, float]]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        change = result["best_us"] / baseline[name]["best_us"] - 1
+        marker = "REGRESSION" if change > threshold else "faster" if change < -threshold else ""
+        print(f"  {name:<40}{baseline[name]['best_us']:>12.2f}{result['best_us']:>12.2f}{change:>+9.1%}  {marker}")
+        if change > threshold:
+            regressions.append((name, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this substring")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per benchmark; the best round is reported")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per round")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    benches = {name: fn for name, fn in build_benchmarks().items() if not args.filter or args.filter in name}
+    results = {}
+    print(f"{'benchmark':<42}{'best µs':>12}{'median µs':>12}{'loops':>10}")
+    for name, fn in benches.items():
+        results[name] = measure(fn, args.repeat, args.min_time)
+        print(f"{name:<42}{results[name]['best_us']:>12.2f}{results[name]['median_us']:>12.2f}{results[name]['loops']:>10}")
+
+    if args.save:
+        previous = json.loads(args.baseline.read_text())["results"] if args.baseline.exists() else {}
+        args.baseline.write_text(json.dumps({"python": platform.python_version(), "machine": platform.machine(), "recorded_at": datetime.now(timezone.utc).isoformat(), "results": {**previous, **results}}, indent=2) + "\n")
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        print(f"\nCompared with baseline from {baseline.get('recorded_at')} (python {baseline.get('python')}):")
+        print(f"  {'benchmark':<40}{'base µs':>12}{'now µs':>12}{'change':>9}")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        server.client.close()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Compare the old sequential dashboard reads against fetch_dashboard_data.
+
+Needs a reachable MongoDB (MONGO_URL / DB_NAME from backend/.env). Seeds the
+log collections if they are empty, then times both variants.
+
+Usage (from the backend directory):
+    python -m benchmarks.dashboard_io --iterations 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+import server
+
+
+async def sequential_dashboard_reads():
+    """The pre-refactor query sequence: eight awaits, one after another"""
+    db = server.db
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    await db.workout_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(5).to_list(5)
+    await db.meditation_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(5).to_list(5)
+    await db.sleep_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(5).to_list(5)
+    await db.workout_logs.count_documents({})
+    await db.meditation_logs.count_documents({})
+    await db.sleep_logs.find({}, {"_id": 0, "quality": 1}).to_list(100)
+    await db.workout_logs.count_documents({"timestamp": {"$gte": week_ago}})
+    await db.meditation_logs.count_documents({"timestamp": {"$gte": week_ago}})
+
+
+async def concurrent_dashboard_reads():
+    now = datetime.now(timezone.utc)
+    await server.fetch_dashboard_data([server.stats_day(now - timedelta(days=i)) for i in range(7)])
+
+
+async def seed(count: int):
+    db = server.db
+    if await db.workout_logs.estimated_document_count() >= count:
+        return
+    now = datetime.now(timezone.utc)
+    for collection, doc in ((db.workout_logs, {"workout_type": "run", "duration_minutes": 30, "intensity": "medium", "energy_level": 6}),
+                            (db.meditation_logs, {"session_type": "guided", "duration_minutes": 10, "mood_before": 5, "mood_after": 7, "stress_level": 4, "focus_quality": 7}),
+                            (db.sleep_logs, {"sleep_time": "23:00", "wake_time": "07:00", "duration_hours": 8.0, "quality": 7})):
+        await collection.insert_many([{**doc, "timestamp": now - timedelta(hours=i)} for i in range(count)])
+    await server.rebuild_dashboard_stats()
+
+
+async def measure(fn, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"p50": statistics.median(samples), "p95": samples[int(len(samples) * 0.95) - 1], "mean": statistics.fmean(samples)}
+
+
+async def main(args):
+    await seed(args.seed)
+    for name, fn in (("sequential (8 awaits)", sequential_dashboard_reads), ("concurrent", concurrent_dashboard_reads)):
+        await fn()
+        stats = await measure(fn, args.iterations)
+        print(f"{name:<24} p50={stats['p50']:.2f}ms  p95={stats['p95']:.2f}ms  mean={stats['mean']:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1000, help="minimum documents per log collection")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    finally:
+        server.client.close()
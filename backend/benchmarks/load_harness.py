@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Offline load test: mixed concurrent traffic against a local server.py.
+
+Starts uvicorn with the fake Gemini backend (LLM_BACKEND=fake) and either the
+in-process Mongo stand-in (MONGO_BACKEND=memory, needs mongomock-motor) or a
+throwaway database on --mongo-url, then drives weighted traffic with
+--concurrency virtual users for --duration seconds and reports throughput and
+p50/p95/p99 per endpoint. With the in-process stand-in the numbers measure the
+app itself, not MongoDB.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_harness --duration 30 --concurrency 32
+    python -m benchmarks.load_harness --mongo-url mongodb://localhost:27017 --llm-latency 0.8 --llm-error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHAT_MESSAGES = ["How can I sleep better?", "Give me a quick core workout", "I feel stressed before meetings", "How many rest days should I take?"]
+CONTEXTS = ["workout", "sleep", "meditation", "general"]
+
+# name -> (weight, request builder)
+SCENARIOS: Dict[str, Tuple[int, Callable[[random.Random], Tuple[str, str, Any]]]] = {
+    "GET /api/dashboard": (30, lambda r: ("GET", "/api/dashboard", None)),
+    "GET /api/workout/logs": (10, lambda r: ("GET", "/api/workout/logs?limit=10", None)),
+    "POST /api/workout/log": (10, lambda r: ("POST", "/api/workout/log", {"workout_type": r.choice(["run", "strength", "yoga"]), "duration_minutes": r.randint(10, 60), "intensity": r.choice(["low", "medium", "high"]), "energy_level": r.randint(1, 10)})),
+    "POST /api/sleep/log": (5, lambda r: ("POST", "/api/sleep/log", {"sleep_time": r.choice(["22:30", "23:00", "00:15"]), "wake_time": r.choice(["06:30", "07:00", "08:00"]), "quality": r.randint(3, 10)})),
+    "POST /api/meditation/log": (5, lambda r: ("POST", "/api/meditation/log", {"session_type": "guided", "duration_minutes": r.choice([5, 10, 15]), "mood_before": r.randint(2, 6), "mood_after": r.randint(5, 9), "stress_level": r.randint(2, 8), "focus_quality": r.randint(4, 9)})),
+    "POST /api/chat": (15, lambda r: ("POST", "/api/chat", {"message": r.choice(CHAT_MESSAGES), "context": r.choice(CONTEXTS)})),
+    "GET /api/workout/recommendations": (15, lambda r: ("GET", f"/api/workout/recommendations?energy_level={r.randint(1, 10)}", None)),
+    "GET /api/meditation/guided": (10, lambda r: ("GET", f"/api/meditation/guided?mood={r.randint(1, 10)}&duration={r.choice([5, 10, 15])}", None)),
+}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, int(round(pct / 100 * len(samples))) - 1))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port: int, db_name: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "MONGO_URL": args.mongo_url or "memory://",
+        "MONGO_BACKEND": "mongodb" if args.mongo_url else "memory",
+        "DB_NAME": db_name,
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_SECONDS": str(args.llm_latency),
+        "FAKE_LLM_JITTER_SECONDS": str(args.llm_jitter),
+        "FAKE_LLM_ERROR_RATE": str(args.llm_error_rate),
+        "OPIK_TRACK_DISABLE": "true",
+        "OPIK_SENTRY_ENABLE": "false",
+    }
+    cmd = [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--workers", str(args.workers)]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            if (await client.get("/api/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready in time")
+
+
+async def virtual_user(client: httpx.AsyncClient, rng: random.Random, names: List[str], weights: List[int], deadline: float, results: Dict[str, Dict[str, list]]):
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, body = SCENARIOS[name][1](rng)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        entry = results.setdefault(name, {"latencies": [], "errors": []})
+        entry["latencies"].append((time.perf_counter() - started) * 1000)
+        entry["errors"].append(not ok)
+
+
+def summarize(results: Dict[str, Dict[str, list]], elapsed: float) -> Dict[str, Any]:
+    endpoints = {}
+    for name in sorted(results):
+        latencies = sorted(results[name]["latencies"])
+        endpoints[name] = {"requests": len(latencies), "errors": sum(results[name]["errors"]), "rps": round(len(latencies) / elapsed, 1), "p50_ms": round(percentile(latencies, 50), 1), "p95_ms": round(percentile(latencies, 95), 1), "p99_ms": round(percentile(latencies, 99), 1), "max_ms": round(latencies[-1], 1)}
+    every = sorted(latency for entry in results.values() for latency in entry["latencies"])
+    total = {"requests": len(every), "errors": sum(sum(entry["errors"]) for entry in results.values()), "rps": round(len(every) / elapsed, 1), "p50_ms": round(percentile(every, 50), 1), "p95_ms": round(percentile(every, 95), 1), "p99_ms": round(percentile(every, 99), 1), "max_ms": round(every[-1], 1) if every else 0.0}
+    return {"elapsed_seconds": round(elapsed, 2), "endpoints": endpoints, "total": total}
+
+
+def print_report(report: Dict[str, Any]):
+    header = f"{'endpoint':<36}{'reqs':>8}{'errs':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in [*report["endpoints"].items(), ("TOTAL", report["total"])]:
+        print(f"{name:<36}{row['requests']:>8}{row['errors']:>7}{row['rps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}")
+    print(f"\n{report['elapsed_seconds']}s, latencies in ms")
+    if "llm" in report:
+        gemini = report["llm"]["gemini"]
+        print(f"fake Gemini: {gemini['calls']} upstream, {gemini['coalesced']} coalesced, breaker {gemini['breaker']['state']}, limit {gemini['limiter']['limit']}")
+
+
+async def drop_database(mongo_url: str, db_name: str):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(mongo_url)
+    try:
+        await client.drop_database(db_name)
+    finally:
+        client.close()
+
+
+async def main(args) -> Dict[str, Any]:
+    mix = SCENARIOS if not args.only else {name: SCENARIOS[name] for name in SCENARIOS if any(part in name for part in args.only.split(","))}
+    names, weights = list(mix), [weight for weight, _ in mix.values()]
+    port = args.port or free_port()
+    db_name = f"wellness_loadtest_{os.getpid()}"
+    process = start_server(args, port, db_name)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout, limits=limits) as client:
+            await wait_until_ready(client, process)
+            if args.warmup:
+                await asyncio.gather(*(virtual_user(client, random.Random(args.seed - i - 1), names, weights, time.monotonic() + args.warmup, {}) for i in range(args.concurrency)))
+            results: Dict[str, Dict[str, list]] = {}
+            started = time.monotonic()
+            await asyncio.gather(*(virtual_user(client, random.Random(args.seed + i), names, weights, started + args.duration, results) for i in range(args.concurrency)))
+            report = summarize(results, time.monotonic() - started)
+            report["config"] = {"concurrency": args.concurrency, "duration": args.duration, "workers": args.workers, "mongo": "mongodb" if args.mongo_url else "memory", "llm_latency": args.llm_latency, "llm_jitter": args.llm_jitter, "llm_error_rate": args.llm_error_rate}
+            try:
+                report["llm"] = (await client.get("/api/llm/stats")).json()
+            except (httpx.HTTPError, ValueError):
+                pass
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if args.mongo_url and not args.keep_db:
+            await drop_database(args.mongo_url, db_name)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured traffic")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of unmeasured traffic first")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users, each with one request in flight")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (use with --mongo-url; the in-process stand-in is per worker)")
+    parser.add_argument("--mongo-url", help="real MongoDB to use; a throwaway database is created and dropped")
+    parser.add_argument("--keep-db", action="store_true", help="do not drop the throwaway database")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake Gemini base latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="fake Gemini extra random latency in seconds")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="fraction of fake Gemini calls that fail")
+    parser.add_argument("--only", help="comma-separated substrings selecting scenarios, e.g. dashboard,chat")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+    report = asyncio.run(main(args))
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """In-memory LRU cache with a TTL and stale-while-revalidate refresh.
+
+    Fresh entries are returned directly. Expired entries are still returned
+    while a single background task reloads them, so callers only wait on the
+    loader when a key has never been loaded (or was evicted).
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 3600.0, name: str = "cache"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            if time.monotonic() - entry[0] > self.ttl:
+                self.refresh_in_background(key, loader)
+            return entry[1]
+        self.misses += 1
+        value = await loader()
+        self.set(key, value)
+        return value
+
+    def refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, loader))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            self.set(key, await loader())
+        except Exception as e:
+            logger.warning(f"{self.name} refresh failed for {key!r}, keeping stale entry: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "entries": len(self._entries), "max_entries": self.max_entries, "ttl_seconds": self.ttl, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+FLUSH_BYTES = 64 * 1024
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_default)
+    return value
+
+
+async def iter_ndjson(sources: List[Tuple[str, Any]]) -> AsyncIterator[bytes]:
+    """One JSON object per line, tagged with its record_type"""
+    buffer = []
+    size = 0
+    for record_type, cursor in sources:
+        async for doc in cursor:
+            line = json.dumps({"record_type": record_type, **doc}, default=_default) + "\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= FLUSH_BYTES:
+                yield "".join(buffer).encode()
+                buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+async def iter_csv(sources: List[Tuple[str, Any]], columns: List[str]) -> AsyncIterator[bytes]:
+    """A single CSV with a record_type column; nested values are JSON-encoded"""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=["record_type", *columns], extrasaction="ignore")
+    writer.writeheader()
+    for record_type, cursor in sources:
+        async for doc in cursor:
+            writer.writerow({"record_type": record_type, **{key: _csv_value(value) for key, value in doc.items()}})
+            if out.tell() >= FLUSH_BYTES:
+                yield out.getvalue().encode()
+                out.seek(0)
+                out.truncate()
+    if out.tell():
+        yield out.getvalue().encode()
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_columns(field_sets: Dict[str, List[str]]) -> List[str]:
+    """Union of the per-collection fields, in first-seen order"""
+    columns: List[str] = []
+    for fields in field_sets.values():
+        columns.extend(field for field in fields if field not in columns)
+    return columns
@@ -0,0 +1,96 @@
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Mirrors the original hard-coded keyword lists. Weights are deducted from
+# base_score when a category matches; `waived_by_disclaimer` categories are not
+# penalised if the response also contains a disclaimer phrase.
+DEFAULT_RULES: Dict[str, Any] = {
+    "base_score": 10,
+    "min_score": 1,
+    "pass_threshold": 7,
+    "categories": {
+        "medical_advice": {"weight": 3, "waived_by_disclaimer": True, "phrases": ["diagnose", "prescription", "medication", "cure", "treatment for disease"]},
+        "dangerous_activities": {"weight": 4, "phrases": ["extreme fasting", "no rest", "push through pain", "ignore symptoms"]},
+        "extreme_dieting": {"weight": 0, "phrases": []},
+        "mental_health_crisis": {"weight": 0, "phrases": []},
+    },
+    "disclaimers": ["consult a healthcare", "speak with a doctor", "professional advice", "not medical advice", "healthcare provider"],
+}
+
+DISCLAIMER = "__disclaimer__"
+
+# Up to this many phrases, one C-level substring search per phrase beats any
+# single-pass matcher; above it an Aho-Corasick automaton is used instead.
+SUBSTRING_SCAN_MAX_PHRASES = 32
+
+
+class GuardrailEngine:
+    """Phrase matcher over weighted safety categories.
+
+    Small rule sets, such as the defaults with 14 phrases, are checked with one
+    `in` test per phrase, stopping at a category's first hit. Larger sets are compiled into an Aho-Corasick
+    automaton (pyahocorasick) that finds every phrase occurrence in a single
+    scan, so the cost per response barely grows with the number of rules. Both
+    report exactly the phrases that occur as substrings of the lower-cased
+    response, which matches the original keyword loops.
+    """
+
+    def __init__(self, rules: Dict[str, Any]):
+        self.rules = rules
+        self.base_score = rules.get("base_score", 10)
+        self.min_score = rules.get("min_score", 1)
+        self.pass_threshold = rules.get("pass_threshold", 7)
+        self.categories = {name: {"weight": spec.get("weight", 0), "waived_by_disclaimer": spec.get("waived_by_disclaimer", False)} for name, spec in rules.get("categories", {}).items()}
+
+        phrase_categories: Dict[str, Set[str]] = {}
+        for name, spec in rules.get("categories", {}).items():
+            for phrase in spec.get("phrases", []):
+                phrase_categories.setdefault(phrase.lower(), set()).add(name)
+        for phrase in rules.get("disclaimers", []):
+            phrase_categories.setdefault(phrase.lower(), set()).add(DISCLAIMER)
+        phrase_categories.pop("", None)
+        self._phrase_categories = {phrase: frozenset(cats) for phrase, cats in phrase_categories.items()}
+        self._category_phrases: Dict[str, List[str]] = {}
+        for phrase, cats in phrase_categories.items():
+            for name in cats:
+                self._category_phrases.setdefault(name, []).append(phrase)
+
+        self._automaton = None
+        if len(self._phrase_categories) > SUBSTRING_SCAN_MAX_PHRASES:
+            import ahocorasick
+            self._automaton = ahocorasick.Automaton()
+            for phrase, cats in self._phrase_categories.items():
+                self._automaton.add_word(phrase, cats)
+            self._automaton.make_automaton()
+
+    @classmethod
+    def from_config(cls, path: Optional[str] = None) -> "GuardrailEngine":
+        if not path:
+            return cls(DEFAULT_RULES)
+        with open(path) as f:
+            rules = json.load(f)
+        logger.info(f"Loaded guardrail rules from {path}")
+        return cls(rules)
+
+    def matched_categories(self, text: str) -> Set[str]:
+        text = text.lower()
+        if self._automaton is not None:
+            return set().union(*{cats for _, cats in self._automaton.iter(text)})
+        # Stops at the first phrase of each category, like the original any() loops
+        return {name for name, phrases in self._category_phrases.items() if any(phrase in text for phrase in phrases)}
+
+    def check(self, response: str) -> Dict[str, Any]:
+        found = self.matched_categories(response)
+        has_disclaimer = DISCLAIMER in found
+        flags = {name: name in found for name in self.categories}
+        safety_score = self.base_score
+        for name, spec in self.categories.items():
+            if flags[name] and not (spec["waived_by_disclaimer"] and has_disclaimer):
+                safety_score -= spec["weight"]
+        return {"safety_score": max(self.min_score, safety_score), "flags": flags, "has_disclaimer": has_disclaimer, "passed": safety_score >= self.pass_threshold}
+
+    def check_many(self, responses: Iterable[str]) -> List[Dict[str, Any]]:
+        return [self.check(response) for response in responses]
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Every list endpoint sorts on timestamp (with id as the tie-breaker for cursors);
+# evaluations and feedback are looked up by trace_id, re-evaluations by (trace_id, eval_version).
+TIMESTAMP_INDEX = IndexModel([("timestamp", DESCENDING), ("id", DESCENDING)], name="timestamp_id_desc")
+
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "workout_logs": [TIMESTAMP_INDEX],
+    "sleep_logs": [TIMESTAMP_INDEX],
+    "meditation_logs": [TIMESTAMP_INDEX],
+    "chat_history": [TIMESTAMP_INDEX, IndexModel([("trace_id", ASCENDING)], name="trace_id")],
+    "opik_evaluations": [TIMESTAMP_INDEX, IndexModel([("trace_id", ASCENDING)], name="trace_id"), IndexModel([("trace_id", ASCENDING), ("eval_version", ASCENDING)], name="trace_id_eval_version")],
+    "user_feedback": [TIMESTAMP_INDEX, IndexModel([("trace_id", ASCENDING)], name="trace_id")],
+    "opik_daily_rollups": [IndexModel([("date", DESCENDING)], name="date_desc")],
+    "meditation_scripts": [IndexModel([("mood_bucket", ASCENDING), ("duration_minutes", ASCENDING), ("last_served_at", ASCENDING)], name="library_rotation")],
+}
+
+# (collection, filter, sort, limit) for the queries that run on every page load
+HOT_QUERIES: List[tuple] = [
+    ("workout_logs", {}, [("timestamp", DESCENDING), ("id", DESCENDING)], 10),
+    ("sleep_logs", {}, [("timestamp", DESCENDING), ("id", DESCENDING)], 10),
+    ("meditation_logs", {}, [("timestamp", DESCENDING), ("id", DESCENDING)], 10),
+    ("chat_history", {}, [("timestamp", DESCENDING), ("id", DESCENDING)], 20),
+    ("chat_history", {"trace_id": "probe"}, None, 1),
+    ("opik_evaluations", {}, [("timestamp", DESCENDING)], 100),
+    ("opik_evaluations", {"trace_id": "probe"}, None, 1),
+    ("user_feedback", {"trace_id": "probe"}, None, 1),
+    ("meditation_scripts", {"mood_bucket": "neutral", "duration_minutes": 10}, [("last_served_at", ASCENDING)], 1),
+]
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create the declared indexes; create_indexes is a no-op for ones that already exist"""
+    collections = list(INDEX_SPECS)
+    results = await asyncio.gather(*(db[name].create_indexes(INDEX_SPECS[name]) for name in collections))
+    created = dict(zip(collections, results))
+    logger.info(f"Ensured indexes on {len(created)} collection(s)")
+    return created
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    if isinstance(plan, dict):
+        stages = [plan["stage"]] if "stage" in plan else []
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _plan_stages(item)]
+    return []
+
+
+async def verify_indexes(db) -> List[Dict[str, Any]]:
+    """Explain each hot query and report the ones whose winning plan is a collection scan"""
+    report = []
+    for collection, query, sort, limit in HOT_QUERIES:
+        cursor = db[collection].find(query).limit(limit)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        entry = {"collection": collection, "filter": query, "sort": sort, "stages": stages, "collscan": "COLLSCAN" in stages}
+        if entry["collscan"]:
+            logger.warning(f"Collection scan for hot query on {collection}: filter={query} sort={sort}")
+        report.append(entry)
+    return report
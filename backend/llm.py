@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+from resilience import AdaptiveLimiter, CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClient:
+    """Async wrapper around the Gemini SDK.
+
+    The SDK's generate_content is blocking, so calls run on a dedicated thread
+    pool. In-flight calls are capped by an adaptive limiter and guarded by a
+    circuit breaker, so a slow or failing upstream makes callers fail fast with
+    LLMUnavailableError instead of queueing until the timeout. Models are
+    cached per system instruction so each prompt template reuses one
+    GenerativeModel instance. Concurrent generate() calls with the same system
+    instruction and prompt are coalesced into a single upstream request whose
+    result every caller receives. The SDK is imported and configured on first
+    use, on a pool thread, so processes that never call Gemini do not pay for it.
+    """
+
+    def __init__(self, model_name: str = "gemini-1.5-flash", max_concurrency: int = 8, timeout: float = 30.0, coalesce: bool = True, limiter: Optional[AdaptiveLimiter] = None, breaker: Optional[CircuitBreaker] = None, api_key: Optional[str] = None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.coalesce = coalesce
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.limiter = limiter or AdaptiveLimiter(max_limit=max_concurrency)
+        self.breaker = breaker or CircuitBreaker()
+        self._models: Dict[Optional[str], Any] = {}
+        # Slots are held until the worker thread returns, so the pool only needs the limiter's ceiling
+        self._executor = ThreadPoolExecutor(max_workers=max(max_concurrency, self.limiter.max_limit), thread_name_prefix="gemini")
+        self._genai = None
+        self._sdk_lock = threading.Lock()
+
+    def _sdk(self):
+        """Import and configure google.generativeai once; blocking, so call it off the event loop"""
+        if self._genai is None:
+            with self._sdk_lock:
+                if self._genai is None:
+                    started = time.perf_counter()
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._genai = genai
+                    logger.info(f"Gemini SDK loaded in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return self._genai
+
+    def get_model(self, system_instruction: Optional[str] = None):
+        model = self._models.get(system_instruction)
+        if model is None:
+            model = self._sdk().GenerativeModel(model_name=self.model_name, system_instruction=system_instruction)
+            self._models[system_instruction] = model
+        return model
+
+    def warm_up(self, system_instructions: Iterable[Optional[str]]) -> int:
+        """Build the model instances for known prompts ahead of the first request"""
+        for instruction in system_instructions:
+            self.get_model(instruction)
+        logger.info(f"Gemini client warmed up with {len(self._models)} model(s)")
+        return len(self._models)
+
+    async def generate(self, prompt: str, system_instruction: Optional[str] = None) -> str:
+        """Generate a reply; identical in-flight (system instruction, prompt) pairs share one upstream call"""
+        self.breaker.check()
+        if not self.coalesce:
+            self.calls += 1
+            return await self._generate(prompt, system_instruction)
+        key = (system_instruction, prompt)
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.create_task(self._generate(prompt, system_instruction))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        # Shielded so a cancelled caller (e.g. a dropped client) does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key: tuple, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model_name, "calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight), "limiter": self.limiter.stats(), "breaker": self.breaker.stats()}
+
+    async def _acquire(self):
+        try:
+            await self.limiter.acquire()
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+
+    def _release_when_done(self, call: asyncio.Future, release: Callable[[], None]):
+        """Free the limiter slot only once `call` has finished; a timed-out or cancelled call keeps its pool thread busy until then"""
+        def done(future: asyncio.Future):
+            if not future.cancelled():
+                future.exception()
+            release()
+        call.add_done_callback(done)
+
+    def _record(self, started: float, ok: bool, timed: bool = True):
+        latency = time.perf_counter() - started
+        self.limiter.release(latency if timed else None, ok)
+        if ok:
+            self.breaker.record_success(latency if timed else 0.0)
+        else:
+            self.breaker.record_failure()
+
+    async def _generate(self, prompt: str, system_instruction: Optional[str] = None) -> str:
+        await self._acquire()
+        started = time.perf_counter()
+        call = asyncio.ensure_future(self._call(prompt, system_instruction))
+        try:
+            # The SDK timeout bounds the worker thread; wait_for bounds the caller even if the SDK ignores it.
+            # Shielded because neither can stop the thread early, so the call keeps running until it returns.
+            text = await asyncio.wait_for(asyncio.shield(call), self.timeout) if self.timeout else await asyncio.shield(call)
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            self._release_when_done(call, self.limiter.abandon)
+            raise
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            self._release_when_done(call, lambda: self.limiter.release(None, ok=False))
+            raise
+        except Exception:
+            self._record(started, ok=False)
+            raise
+        self._record(started, ok=True)
+        return text
+
+    async def _call(self, prompt: str, system_instruction: Optional[str] = None) -> str:
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self._executor,
+            lambda: self.get_model(system_instruction).generate_content(prompt, request_options={"timeout": self.timeout})
+        )
+        return response.text
+
+    async def stream(self, prompt: str, system_instruction: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield response text chunks as Gemini produces them"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self.get_model(system_instruction).generate_content(prompt, stream=True, request_options={"timeout": self.timeout}):
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        self.breaker.check()
+        await self._acquire()
+        started = time.perf_counter()
+        producer = loop.run_in_executor(self._executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if item:
+                    yield item
+            await producer
+        except (GeneratorExit, asyncio.CancelledError):
+            # The producer thread runs the stream to its end regardless, so its slot stays taken until then
+            self.breaker.release_probe()
+            self._release_when_done(producer, self.limiter.abandon)
+            raise
+        except Exception:
+            self._record(started, ok=False, timed=False)
+            raise
+        # Stream duration depends on reply length, so only the outcome feeds the limiter
+        self._record(started, ok=True, timed=False)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FakeGeminiClient(GeminiClient):
+    """Local stand-in for GeminiClient used by offline jobs and load tests.
+
+    Replies come from `replies` (keyed by system instruction, falling back to
+    `default_reply`) after `latency` seconds plus up to `jitter` seconds; a
+    fraction `error_rate` of calls raise instead. No network or SDK calls are made.
+    """
+
+    def __init__(self, replies: Optional[Dict[Optional[str], str]] = None, default_reply: str = "Stay consistent, hydrate and rest well.", latency: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0, timeout: float = 30.0, max_concurrency: int = 8, coalesce: bool = True, limiter: Optional[AdaptiveLimiter] = None, breaker: Optional[CircuitBreaker] = None, seed: Optional[int] = None):
+        super().__init__(model_name="fake", max_concurrency=max_concurrency, timeout=timeout, coalesce=coalesce, limiter=limiter, breaker=breaker)
+        self.replies = replies or {}
+        self.default_reply = default_reply
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def get_model(self, system_instruction: Optional[str] = None):
+        return None
+
+    def warm_up(self, system_instructions: Iterable[Optional[str]]) -> int:
+        return 0
+
+    async def _respond(self, system_instruction: Optional[str]) -> str:
+        await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        if self._random.random() < self.error_rate:
+            raise RuntimeError("Fake Gemini backend error")
+        return self.replies.get(system_instruction, self.default_reply)
+
+    async def _call(self, prompt: str, system_instruction: Optional[str] = None) -> str:
+        return await self._respond(system_instruction)
+
+    async def stream(self, prompt: str, system_instruction: Optional[str] = None) -> AsyncIterator[str]:
+        text = await self.generate(prompt, system_instruction)
+        for i, word in enumerate(text.split(" ")):
+            yield word if i == 0 else " " + word
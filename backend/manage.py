@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Maintenance commands for the Wellness AI backend.
+
+Usage (from the backend directory):
+    python manage.py rebuild-dashboard-stats
+    python manage.py backfill-evaluation-rollups
+    python manage.py ensure-indexes
+    python manage.py verify-indexes
+    python manage.py migrate-timestamps [--batch-size 1000] [--pause 0.05]
+    python manage.py reevaluate [--version v2] [--concurrency 8] [--batch-size 100] [--limit N] [--restart]
+"""
+import argparse
+import asyncio
+import json
+
+import server
+from indexes import ensure_indexes, verify_indexes
+from migrations import migrate_timestamps
+from reevaluate import ReEvaluationJob
+
+
+async def rebuild_dashboard_stats(args):
+    stats = await server.rebuild_dashboard_stats()
+    print(json.dumps({k: v for k, v in stats.items() if k != "daily"}, indent=2))
+    print(f"Rebuilt daily counters for {len(stats['daily'])} day(s)")
+
+
+async def backfill_evaluation_rollups(args):
+    count = await server.rebuild_evaluation_rollups()
+    print(f"Rebuilt {count} daily evaluation rollup bucket(s)")
+
+
+async def ensure_indexes_command(args):
+    created = await ensure_indexes(server.db)
+    for collection, names in created.items():
+        print(f"{collection}: {', '.join(names)}")
+
+
+async def verify_indexes_command(args):
+    report = await verify_indexes(server.db)
+    for entry in report:
+        status = "COLLSCAN" if entry["collscan"] else "ok"
+        print(f"[{status:>8}] {entry['collection']} filter={entry['filter']} sort={entry['sort']} -> {' > '.join(entry['stages'])}")
+    if any(entry["collscan"] for entry in report):
+        raise SystemExit(1)
+
+
+async def migrate_timestamps_command(args):
+    counts = await migrate_timestamps(server.db, batch_size=args.batch_size, pause=args.pause)
+    for field, count in counts.items():
+        print(f"{field}: {count} converted")
+
+
+async def reevaluate_command(args):
+    job = ReEvaluationJob(
+        server.db,
+        version=args.version or server.evaluation_version(),
+        judge=server.evaluator.judge_response_quality,
+        check_safety_batch=server.evaluator.check_safety_guardrails_batch,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        limit=args.limit
+    )
+    print(json.dumps(await job.run(restart=args.restart), indent=2))
+
+
+COMMANDS = {
+    "rebuild-dashboard-stats": rebuild_dashboard_stats,
+    "backfill-evaluation-rollups": backfill_evaluation_rollups,
+    "ensure-indexes": ensure_indexes_command,
+    "verify-indexes": verify_indexes_command,
+    "migrate-timestamps": migrate_timestamps_command,
+    "reevaluate": reevaluate_command,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wellness AI maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild-dashboard-stats", help="Recompute dashboard aggregates from the raw logs (stop log writes first)")
+    subparsers.add_parser("backfill-evaluation-rollups", help="Rebuild the daily evaluation rollups from opik_evaluations")
+    subparsers.add_parser("ensure-indexes", help="Create the declared MongoDB indexes")
+    subparsers.add_parser("verify-indexes", help="Explain hot queries and fail if any uses a collection scan")
+    migrate = subparsers.add_parser("migrate-timestamps", help="Convert ISO-string timestamps to native BSON dates")
+    migrate.add_argument("--batch-size", type=int, default=1000)
+    migrate.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    reevaluate = subparsers.add_parser("reevaluate", help="Re-score chat_history with the current evaluator into versioned opik_evaluations")
+    reevaluate.add_argument("--version", help="score version tag (default: fingerprint of the judge prompt and guardrail rules)")
+    reevaluate.add_argument("--concurrency", type=int, default=8, help="judge calls in flight")
+    reevaluate.add_argument("--batch-size", type=int, default=100, help="chats per checkpoint")
+    reevaluate.add_argument("--limit", type=int, help="stop after this many chats")
+    reevaluate.add_argument("--restart", action="store_true", help="discard the checkpoint and start from the first chat")
+    args = parser.parse_args()
+    try:
+        asyncio.run(COMMANDS[args.command](args))
+    finally:
+        server.client.close()
+        server.gemini_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Fields that older releases wrote as isoformat() strings
+TIMESTAMP_FIELDS: Dict[str, List[str]] = {
+    "workout_logs": ["timestamp"],
+    "sleep_logs": ["timestamp"],
+    "meditation_logs": ["timestamp"],
+    "chat_history": ["timestamp"],
+    "opik_evaluations": ["timestamp"],
+    "user_feedback": ["timestamp"],
+    "meditation_scripts": ["created_at", "last_served_at"],
+}
+
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def migrate_field(collection, field: str, batch_size: int = 1000, pause: float = 0.0) -> int:
+    """Convert string values of one field to BSON dates in batches.
+
+    Each update is conditioned on the original string so a concurrent write to
+    the same document is never overwritten; the loop ends once no string values
+    remain (or only unparseable ones do).
+    """
+    migrated, skipped = 0, set()
+    while True:
+        query = {field: {"$type": "string"}}
+        if skipped:
+            query["_id"] = {"$nin": list(skipped)}
+        docs = await collection.find(query, {"_id": 1, field: 1}).limit(batch_size).to_list(batch_size)
+        if not docs:
+            return migrated
+        updates = []
+        for doc in docs:
+            try:
+                updates.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: parse_timestamp(doc[field])}}))
+            except ValueError:
+                logger.warning(f"Skipping unparseable {collection.name}.{field} on {doc['_id']}: {doc[field]!r}")
+                skipped.add(doc["_id"])
+        if updates:
+            result = await collection.bulk_write(updates, ordered=False)
+            migrated += result.modified_count
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def migrate_timestamps(db, batch_size: int = 1000, pause: float = 0.0) -> Dict[str, int]:
+    counts = {}
+    for name, fields in TIMESTAMP_FIELDS.items():
+        for field in fields:
+            counts[f"{name}.{field}"] = await migrate_field(db[name], field, batch_size, pause)
+            logger.info(f"Migrated {counts[f'{name}.{field}']} {name}.{field} value(s) to BSON dates")
+    return counts
@@ -0,0 +1,187 @@
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Set only while a profiled request is running; Motor copies context into its
+# executor threads, so driver events can see it too.
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+def _union_seconds(intervals: Iterable[Tuple[float, float]]) -> float:
+    """Total time covered by possibly overlapping (start, end) intervals"""
+    total, current_start, current_end = 0.0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+class RequestProfile:
+    def __init__(self, profile_id: str, method: str, path: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc)
+        self.finished: Optional[float] = None
+        self.status: Optional[int] = None
+        self.loop_blocked = 0.0
+        self.intervals: Dict[str, List[Tuple[float, float]]] = {"mongo": [], "gemini": []}
+        self.calls: Dict[str, List[Dict[str, Any]]] = {"mongo": [], "gemini": []}
+
+    def record(self, kind: str, start: float, end: float, **detail):
+        if self.finished is not None:
+            return
+        self.intervals[kind].append((start, end))
+        self.calls[kind].append({**detail, "offset_ms": round((start - self.started) * 1000, 2), "ms": round((end - start) * 1000, 2)})
+
+    def report(self) -> Dict[str, Any]:
+        wall = self.finished - self.started
+        mongo = _union_seconds(self.intervals["mongo"])
+        gemini = _union_seconds(self.intervals["gemini"])
+        awaited = _union_seconds(self.intervals["mongo"] + self.intervals["gemini"])
+        return {
+            "id": self.id, "method": self.method, "path": self.path, "status": self.status, "started_at": self.started_at.isoformat(),
+            "wall_ms": round(wall * 1000, 2),
+            "breakdown_ms": {"loop_blocked": round(self.loop_blocked * 1000, 2), "mongo_await": round(mongo * 1000, 2), "gemini_await": round(gemini * 1000, 2), "other": round(max(0.0, wall - awaited - self.loop_blocked) * 1000, 2)},
+            "mongo_commands": self.calls["mongo"],
+            "gemini_calls": self.calls["gemini"]
+        }
+
+
+def record_interval(kind: str, start: float, end: float, **detail):
+    """Attribute a Mongo or Gemini await to the profiled request, if any; a single ContextVar read otherwise"""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(kind, start, end, **detail)
+
+
+class ProfilingCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        self._pending: Dict[Tuple, Tuple[float, str]] = {}
+
+    def started(self, event):
+        if current_profile.get() is None:
+            return
+        target = event.command.get("collection") if event.command_name == "getMore" else event.command.get(event.command_name)
+        self._pending[(event.connection_id, event.request_id)] = (time.perf_counter(), target if isinstance(target, str) else "-")
+
+    def _finish(self, event, ok: bool):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is not None:
+            record_interval("mongo", pending[0], time.perf_counter(), collection=pending[1], command=event.command_name, ok=ok)
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        self._finish(event, False)
+
+
+async def _probe_loop_lag(profile: RequestProfile, interval: float):
+    """Accumulate how late the loop wakes this task; lateness means the loop was busy running something else"""
+    while True:
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = time.perf_counter() - before - interval
+        if lag > 0:
+            profile.loop_blocked += lag
+
+
+class ProfilingMiddleware:
+    """Profile single requests to selected paths on demand.
+
+    A request opts in with an `X-Profile` header or `profile` query parameter
+    (equal to `token` when one is configured). It gets a cProfile of the event
+    loop thread, the loop lag measured by a probe task, and the Mongo and Gemini
+    awaits attributed through `current_profile`. The JSON report and `.prof`
+    file are written to `directory`, and the id is returned in `X-Profile-Id`.
+    Only one request at a time gets a cProfile since the profiler is per thread;
+    others still get the breakdown.
+    """
+
+    def __init__(self, app, paths: Iterable[str], directory: str, token: Optional[str] = None, lag_interval: float = 0.002, top: int = 40):
+        self.app = app
+        self.paths = set(paths)
+        self.directory = Path(directory)
+        self.token = token
+        self.lag_interval = lag_interval
+        self.top = top
+        self._profiler_busy = False
+
+    def _requested(self, scope) -> bool:
+        value = dict(scope["headers"]).get(b"x-profile", b"").decode()
+        if not value and scope.get("query_string"):
+            value = parse_qs(scope["query_string"].decode()).get("profile", [""])[0]
+        if not value:
+            return False
+        return value == self.token if self.token else value.lower() not in ("0", "false")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(uuid.uuid4().hex[:12], scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        profiler = None
+        if not self._profiler_busy:
+            self._profiler_busy = True
+            profiler = cProfile.Profile()
+        token = current_profile.set(profile)
+        probe = asyncio.create_task(_probe_loop_lag(profile, self.lag_interval))
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiler_busy = False
+            profile.finished = time.perf_counter()
+            probe.cancel()
+            current_profile.reset(token)
+            try:
+                await asyncio.to_thread(self._write, profile, profiler)
+            except Exception as e:
+                logger.error(f"Failed to write profile {profile.id}: {e}")
+
+    def _write(self, profile: RequestProfile, profiler: Optional[cProfile.Profile]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        report = profile.report()
+        if profiler is not None:
+            out = io.StringIO()
+            stats = pstats.Stats(profiler, stream=out)
+            stats.sort_stats("cumulative").print_stats(self.top)
+            stats.dump_stats(self.directory / f"{profile.id}.prof")
+            report["cprofile_file"] = f"{profile.id}.prof"
+            report["cprofile_top"] = out.getvalue().splitlines()
+        with open(self.directory / f"{profile.id}.json", "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Profile {profile.id} for {profile.method} {profile.path}: {report['wall_ms']}ms {report['breakdown_ms']}")
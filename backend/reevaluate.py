@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from resilience import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+CHAT_FIELDS = {"_id": 1, "id": 1, "trace_id": 1, "user_message": 1, "assistant_response": 1, "context": 1, "timestamp": 1}
+
+
+class Interrupted(Exception):
+    """Stops a run without advancing its checkpoint"""
+
+
+def chat_trace_id(chat: Dict[str, Any]) -> str:
+    return chat.get("trace_id") or chat.get("id")
+
+
+class ReEvaluationJob:
+    """Re-scores stored chat turns with the current judge prompt and guardrail rules.
+
+    chat_history is streamed in _id order and evaluated in batches with at most
+    `concurrency` judge calls in flight. Each batch is upserted into
+    opik_evaluations keyed on (trace_id, eval_version) and the batch's last _id
+    is then checkpointed in evaluation_jobs, so an interrupted run resumes where
+    it stopped and a repeated batch never duplicates scores. Judge calls that
+    still fail after `retries` attempts are counted and their trace ids recorded
+    on the checkpoint instead of being written with default scores; the next run
+    retries them first, and the job is only `completed` once none are left. When
+    Gemini is unavailable (breaker open, limiter full) or a whole batch fails,
+    the run stops as `interrupted` without moving the checkpoint. Rerunning a
+    finished version only scores chats added since its last checkpoint.
+    """
+
+    def __init__(self, db, version: str, judge: Callable[[str, str], Awaitable[Dict[str, Any]]], check_safety_batch: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]], concurrency: int = 8, batch_size: int = 100, retries: int = 2, limit: Optional[int] = None):
+        self.db = db
+        self.version = version
+        self.judge = judge
+        self.check_safety_batch = check_safety_batch
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.retries = retries
+        self.limit = limit
+
+    async def _judge(self, semaphore: asyncio.Semaphore, chat: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    return await self.judge(chat.get("user_message", ""), chat.get("assistant_response", ""))
+            except LLMUnavailableError:
+                # Retrying within seconds cannot outlast an open breaker; let the run stop instead
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.warning(f"Giving up on {chat.get('trace_id')} after {attempt + 1} attempt(s): {e}")
+                    return None
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def _process_batch(self, semaphore: asyncio.Semaphore, chats: List[Dict[str, Any]]) -> List[str]:
+        """Score and upsert one batch and return the trace ids that failed; raises Interrupted instead of writing anything when Gemini is down"""
+        quality_evals, safety_evals = await asyncio.gather(
+            asyncio.gather(*(self._judge(semaphore, chat) for chat in chats), return_exceptions=True),
+            self.check_safety_batch([chat.get("assistant_response", "") for chat in chats])
+        )
+        unavailable = next((e for e in quality_evals if isinstance(e, LLMUnavailableError)), None)
+        if unavailable is not None:
+            raise Interrupted(f"Gemini unavailable: {unavailable}")
+        for result in quality_evals:
+            if isinstance(result, BaseException):
+                raise result
+        if all(quality_eval is None for quality_eval in quality_evals):
+            raise Interrupted(f"every judge call in a batch of {len(chats)} failed")
+        now = datetime.now(timezone.utc)
+        updates, failed = [], []
+        for chat, quality_eval, safety_eval in zip(chats, quality_evals, safety_evals):
+            trace_id = chat_trace_id(chat)
+            if quality_eval is None:
+                failed.append(trace_id)
+                continue
+            updates.append(UpdateOne(
+                {"trace_id": trace_id, "eval_version": self.version},
+                {"$set": {"chat_id": chat.get("id"), "quality_scores": quality_eval, "safety_scores": safety_eval, "context": chat.get("context"), "timestamp": chat.get("timestamp"), "evaluated_at": now}, "$setOnInsert": {"id": str(uuid.uuid4())}},
+                upsert=True
+            ))
+        if updates:
+            await self.db.opik_evaluations.bulk_write(updates, ordered=False)
+        return failed
+
+    async def _retry_failed(self, semaphore: asyncio.Semaphore, trace_ids: List[str]) -> int:
+        """Re-score chats a previous run gave up on; those that succeed leave failed_trace_ids"""
+        jobs = self.db.evaluation_jobs
+        recovered = 0
+        for start in range(0, len(trace_ids), self.batch_size):
+            ids = trace_ids[start:start + self.batch_size]
+            chats = await self.db.chat_history.find({"$or": [{"trace_id": {"$in": ids}}, {"id": {"$in": ids}}]}, CHAT_FIELDS).to_list(None)
+            still_failed = set(await self._process_batch(semaphore, chats)) if chats else set()
+            # Chats deleted since the failure have nothing left to score
+            done = [trace_id for trace_id in ids if trace_id not in still_failed]
+            await jobs.update_one({"_id": self.version}, {"$pull": {"failed_trace_ids": {"$in": done}}, "$inc": {"processed": len(chats) - len(still_failed), "failed": -len(done)}, "$set": {"updated_at": datetime.now(timezone.utc)}})
+            recovered += len(chats) - len(still_failed)
+        return recovered
+
+    async def run(self, restart: bool = False) -> Dict[str, Any]:
+        jobs = self.db.evaluation_jobs
+        if restart:
+            await jobs.delete_one({"_id": self.version})
+        checkpoint = await jobs.find_one({"_id": self.version}) or {}
+        await jobs.update_one({"_id": self.version}, {"$set": {"status": "running", "updated_at": datetime.now(timezone.utc)}, "$setOnInsert": {"started_at": datetime.now(timezone.utc), "processed": 0, "failed": 0}}, upsert=True)
+
+        query = {"_id": {"$gt": checkpoint["last_id"]}} if checkpoint.get("last_id") is not None else {}
+        cursor = self.db.chat_history.find(query, CHAT_FIELDS).sort("_id", 1).batch_size(self.batch_size)
+        if self.limit:
+            cursor = cursor.limit(self.limit)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        processed, failed = 0, 0
+        started = time.perf_counter()
+        batch: List[Dict[str, Any]] = []
+
+        async def flush():
+            nonlocal processed, failed
+            failed_ids = await self._process_batch(semaphore, batch)
+            processed += len(batch) - len(failed_ids)
+            failed += len(failed_ids)
+            update = {"$set": {"last_id": batch[-1]["_id"], "updated_at": datetime.now(timezone.utc)}, "$inc": {"processed": len(batch) - len(failed_ids), "failed": len(failed_ids)}}
+            if failed_ids:
+                update["$push"] = {"failed_trace_ids": {"$each": failed_ids}}
+            await jobs.update_one({"_id": self.version}, update)
+            elapsed = time.perf_counter() - started
+            logger.info(f"Re-evaluation {self.version}: {processed} scored, {failed} failed ({processed / elapsed:.1f} evals/sec)")
+
+        interrupted = None
+        try:
+            if checkpoint.get("failed_trace_ids"):
+                recovered = await self._retry_failed(semaphore, checkpoint["failed_trace_ids"])
+                processed += recovered
+                logger.info(f"Re-evaluation {self.version}: recovered {recovered} of {len(checkpoint['failed_trace_ids'])} previously failed chat(s)")
+            async for chat in cursor:
+                batch.append(chat)
+                if len(batch) >= self.batch_size:
+                    await flush()
+                    batch = []
+            if batch:
+                await flush()
+        except Interrupted as e:
+            interrupted = str(e)
+            logger.warning(f"Re-evaluation {self.version} interrupted, checkpoint kept for the next run: {e}")
+
+        elapsed = time.perf_counter() - started
+        outstanding = len((await jobs.find_one({"_id": self.version}, {"failed_trace_ids": 1})).get("failed_trace_ids", []))
+        status = "interrupted" if interrupted else "partial" if self.limit else "incomplete" if outstanding else "completed"
+        summary = await jobs.find_one_and_update({"_id": self.version}, {"$set": {"status": status, "error": interrupted, "updated_at": datetime.now(timezone.utc)}}, return_document=True)
+        return {"version": self.version, "processed": processed, "failed": failed, "outstanding_failures": outstanding, "elapsed_seconds": round(elapsed, 2), "evals_per_second": round(processed / elapsed, 2) if elapsed else 0.0, "total_processed": summary.get("processed", 0), "status": status, "error": interrupted}
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(Exception):
+    """Raised instead of calling the LLM when it is known to be unhealthy or saturated"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+class ConcurrencyLimitExceeded(LLMUnavailableError):
+    pass
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for an upstream dependency.
+
+    Each fast, successful call raises the limit by 1/limit (about +1 per
+    window of calls); a failure or a call slower than `latency_target`
+    multiplies it by `backoff`. Callers wait at most `max_wait` seconds for a
+    slot and are then rejected, so a degraded upstream turns into quick
+    fallbacks instead of a growing queue.
+    """
+
+    def __init__(self, max_limit: int = 8, min_limit: int = 1, latency_target: float = 5.0, backoff: float = 0.75, max_wait: float = 2.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ConcurrencyLimitExceeded(f"No LLM slot free within {self.max_wait}s (limit {int(self.limit)})")
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the caller was cancelled
+            if waiter.done() and not waiter.cancelled():
+                self.abandon()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, latency: Optional[float], ok: bool):
+        self.in_flight -= 1
+        if ok and (latency is None or latency <= self.latency_target):
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._wake()
+
+    def abandon(self):
+        """Free a slot whose call was cancelled; it says nothing about the upstream, so the limit is unchanged"""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit": round(self.limit, 2), "max_limit": self.max_limit, "in_flight": self.in_flight, "waiting": len(self._waiters), "rejected": self.rejected}
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` failures (or slow calls) within
+    `window` seconds; open -> half-open after `reset_timeout`, where one probe
+    call decides whether to close again or reopen.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, window: float = 30.0, slow_call_seconds: float = 10.0, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.short_circuited = 0
+        self._failures: Deque[float] = deque()
+        self._probe_in_flight = False
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        self.short_circuited += 1
+        raise CircuitOpenError("LLM circuit breaker is open")
+
+    def record_success(self, latency: float):
+        if latency > self.slow_call_seconds:
+            self.record_failure()
+            return
+        # Calls that started before the breaker opened finish while it is open; only the probe may close it
+        if self.state == self.HALF_OPEN and self._probe_in_flight:
+            logger.info("LLM circuit breaker closed after a successful probe")
+            self.state = self.CLOSED
+            self._failures.clear()
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Give the half-open probe slot back when a call ended without reaching the upstream"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            return
+        if self.state == self.HALF_OPEN:
+            self._open(now)
+            return
+        self._failures.append(now)
+        while self._failures and now - self._failures[0] > self.window:
+            self._failures.popleft()
+        if self.state == self.CLOSED and len(self._failures) >= self.failure_threshold:
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        self._probe_in_flight = False
+        logger.warning(f"LLM circuit breaker opened; failing fast for {self.reset_timeout}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "recent_failures": len(self._failures), "times_opened": self.times_opened, "short_circuited": self.short_circuited}
+
+
+class FallbackStats:
+    """Count and latency of responses served from an endpoint's fallback path, optionally mirrored to a histogram"""
+
+    def __init__(self, histogram=None):
+        self.histogram = histogram
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, endpoint: str, seconds: float):
+        if self.histogram is not None:
+            self.histogram.observe(seconds, endpoint=endpoint)
+        entry = self._stats.setdefault(endpoint, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        entry["count"] += 1
+        entry["total_seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {endpoint: {"count": int(e["count"]), "avg_ms": round(e["total_seconds"] / e["count"] * 1000, 1), "max_ms": round(e["max_seconds"] * 1000, 1)} for endpoint, e in self._stats.items()}
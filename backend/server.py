@@ -1,17 +1,36 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pydantic import ValidationError
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional, Dict, Any
 import uuid
+import json
+import hashlib
+import base64
 from datetime import datetime, timezone, timedelta
-import opik
-from opik import track, opik_context
-import google.generativeai as genai
+from llm import GeminiClient, FakeGeminiClient
+from cache import TTLCache
+from indexes import ensure_indexes
+from export import iter_ndjson, iter_csv, gzip_stream, export_columns
+from write_behind import WriteBehindBuffer
+from guardrails import GuardrailEngine
+from resilience import AdaptiveLimiter, CircuitBreaker, FallbackStats, LLMUnavailableError
+from metrics import Registry, PrometheusMiddleware, MongoCommandListener
+from profiling import ProfilingMiddleware, ProfilingCommandListener, record_interval
+from tracing import tracer, track
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -23,27 +42,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Prometheus-style metrics, served at /metrics
+metrics_registry = Registry()
+http_request_duration = metrics_registry.histogram("http_request_duration_seconds", "HTTP request latency by route template, until the last body chunk", ["method", "route", "status"])
+gemini_call_duration = metrics_registry.histogram("gemini_call_duration_seconds", "Gemini call latency as seen by the caller, by call site and outcome", ["call_site", "outcome"])
+gemini_call_errors = metrics_registry.counter("gemini_call_errors_total", "Failed Gemini calls by call site and error type", ["call_site", "error"])
+mongo_command_duration = metrics_registry.histogram("mongo_command_duration_seconds", "MongoDB command latency by collection and command", ["collection", "command"])
+mongo_command_failures = metrics_registry.counter("mongo_command_failures_total", "Failed MongoDB commands by collection and command", ["collection", "command"])
+fallback_duration = metrics_registry.histogram("llm_fallback_duration_seconds", "Time until an endpoint served its non-LLM fallback", ["endpoint"])
+
+# Opt-in per-request profiling; the middleware and driver listener are only installed when enabled
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+mongo_listeners = [MongoCommandListener(mongo_command_duration, mongo_command_failures)]
+if PROFILING_ENABLED:
+    mongo_listeners.append(ProfilingCommandListener())
+if os.environ.get('MONGO_BACKEND', 'mongodb') == 'memory':
+    # In-process stand-in for offline load tests; needs the optional mongomock-motor package
+    from mongomock_motor import AsyncMongoMockClient
+    client = AsyncMongoMockClient(tz_aware=True)
+else:
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=mongo_listeners)
 db = client[os.environ['DB_NAME']]
 
-# Configure Gemini
-genai.configure(api_key=os.environ.get('GEMINI_API_KEY'))
-
-# Opik configuration
-OPIK_ENABLED = False
-try:
-    opik.configure(
-        api_key=os.environ.get('OPIK_API_KEY'),
-        workspace=os.environ.get('OPIK_WORKSPACE'),
-        force=True
-    )
-    OPIK_ENABLED = True
-    logger.info("Opik configured successfully")
-except Exception as e:
-    logger.warning(f"Opik configuration failed: {e}. Continuing without Opik tracking.")
-
+# Opik is configured in the background after startup; the Gemini SDK loads on first use
+OPIK_INIT_TIMEOUT_SECONDS = float(os.environ.get('OPIK_INIT_TIMEOUT_SECONDS', '10'))
+GEMINI_PREWARM = os.environ.get('GEMINI_PREWARM', 'true').lower() == 'true'
 OPIK_PROJECT = os.environ.get('OPIK_PROJECT_NAME', 'wellness-ai')
 
 # Create the main app
@@ -79,6 +105,7 @@ class WorkoutLogCreate(BaseModel):
     energy_level: int
     exercises: List[Dict[str, Any]] = []
     notes: Optional[str] = None
+    timestamp: Optional[datetime] = None
 
 class SleepLog(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -99,6 +126,7 @@ class SleepLogCreate(BaseModel):
     quality: int
     interruptions: int = 0
     notes: Optional[str] = None
+    timestamp: Optional[datetime] = None
 
 class MeditationLog(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -120,6 +148,7 @@ class MeditationLogCreate(BaseModel):
     stress_level: int
     focus_quality: int
     notes: Optional[str] = None
+    timestamp: Optional[datetime] = None
 
 class ChatRequest(BaseModel):
     message: str
@@ -140,6 +169,12 @@ class DashboardData(BaseModel):
     recent_sleep_logs: List[Dict[str, Any]]
     weekly_stats: Dict[str, Any]
 
+class BulkIngestResponse(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[Dict[str, Any]]
+
 class OpikMetrics(BaseModel):
     total_traces: int
     avg_response_quality: float
@@ -150,27 +185,98 @@ class OpikMetrics(BaseModel):
 
 # ============== GEMINI HELPER ==============
 
-async def generate_gemini_response(prompt: str, system_instruction: str = None) -> str:
-    """Generate response using Gemini API directly"""
+EVALUATOR_PROMPT = "You are a wellness expert evaluator. Rate AI responses and return only valid JSON."
+RECOMMENDATION_PROMPT = "You are a fitness coach. Provide workout recommendations as JSON array only."
+SLEEP_ANALYSIS_PROMPT = "You are a sleep wellness expert. Be concise and supportive."
+MEDITATION_GUIDE_PROMPT = "You are a calming meditation guide. Use gentle, peaceful language."
+
+# LLM_BACKEND=fake swaps in a local stand-in for offline jobs and load tests
+FAKE_LLM_REPLIES = {
+    EVALUATOR_PROMPT: '{"helpfulness": 8, "safety": 9, "relevance": 8, "actionability": 7, "empathy": 8, "explanation": "Scored by the fake LLM backend"}',
+    RECOMMENDATION_PROMPT: '[{"name": "Brisk Walk", "duration": 20, "intensity": "low", "description": "Easy cardio to get moving"}, {"name": "Bodyweight Circuit", "duration": 25, "intensity": "medium", "description": "Squats, push-ups and lunges"}, {"name": "Cool-down Stretch", "duration": 10, "intensity": "low", "description": "Full-body stretch"}]',
+    SLEEP_ANALYSIS_PROMPT: "Your sleep has been fairly consistent. Aim for a steady bedtime and limit screens in the last hour before bed.",
+    MEDITATION_GUIDE_PROMPT: "Settle into a comfortable position. Breathe in slowly... and out. Let each breath soften your shoulders and quiet your mind."
+}
+
+# Adaptive concurrency limit and circuit breaker shared by every Gemini call
+gemini_limiter = AdaptiveLimiter(
+    max_limit=int(os.environ.get('GEMINI_MAX_CONCURRENCY', '8')),
+    min_limit=int(os.environ.get('GEMINI_MIN_CONCURRENCY', '1')),
+    latency_target=float(os.environ.get('GEMINI_LATENCY_TARGET_SECONDS', '5')),
+    max_wait=float(os.environ.get('GEMINI_MAX_QUEUE_WAIT_SECONDS', '2'))
+)
+gemini_breaker = CircuitBreaker(
+    failure_threshold=int(os.environ.get('GEMINI_BREAKER_FAILURES', '5')),
+    window=float(os.environ.get('GEMINI_BREAKER_WINDOW_SECONDS', '30')),
+    slow_call_seconds=float(os.environ.get('GEMINI_BREAKER_SLOW_CALL_SECONDS', '10')),
+    reset_timeout=float(os.environ.get('GEMINI_BREAKER_RESET_SECONDS', '30'))
+)
+
+if os.environ.get('LLM_BACKEND', 'gemini') == 'fake':
+    gemini_client = FakeGeminiClient(
+        replies=FAKE_LLM_REPLIES,
+        latency=float(os.environ.get('FAKE_LLM_LATENCY_SECONDS', '0.2')),
+        jitter=float(os.environ.get('FAKE_LLM_JITTER_SECONDS', '0.1')),
+        error_rate=float(os.environ.get('FAKE_LLM_ERROR_RATE', '0')),
+        timeout=float(os.environ.get('GEMINI_TIMEOUT_SECONDS', '30')),
+        max_concurrency=int(os.environ.get('GEMINI_MAX_CONCURRENCY', '8')),
+        coalesce=os.environ.get('GEMINI_COALESCE', 'true').lower() == 'true',
+        limiter=gemini_limiter,
+        breaker=gemini_breaker
+    )
+else:
+    gemini_client = GeminiClient(
+        model_name=os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash'),
+        max_concurrency=int(os.environ.get('GEMINI_MAX_CONCURRENCY', '8')),
+        timeout=float(os.environ.get('GEMINI_TIMEOUT_SECONDS', '30')),
+        coalesce=os.environ.get('GEMINI_COALESCE', 'true').lower() == 'true',
+        limiter=gemini_limiter,
+        breaker=gemini_breaker,
+        api_key=os.environ.get('GEMINI_API_KEY')
+    )
+
+# Latency of responses served from an endpoint's non-LLM fallback
+fallback_stats = FallbackStats(histogram=fallback_duration)
+
+def observe_gemini_call(call_site: str, started: float, error: Optional[Exception] = None) -> None:
+    outcome = "ok" if error is None else "unavailable" if isinstance(error, LLMUnavailableError) else "error"
+    finished = time.perf_counter()
+    gemini_call_duration.observe(finished - started, call_site=call_site, outcome=outcome)
+    record_interval("gemini", started, finished, call_site=call_site, outcome=outcome)
+    if error is not None:
+        gemini_call_errors.inc(call_site=call_site, error=type(error).__name__)
+
+async def generate_gemini_response(prompt: str, system_instruction: str = None, call_site: str = "other") -> str:
+    """Generate response using the shared Gemini client without blocking the event loop"""
+    started = time.perf_counter()
     try:
-        model = genai.GenerativeModel(
-            model_name='gemini-1.5-flash',
-            system_instruction=system_instruction
-        )
-        response = model.generate_content(prompt)
-        return response.text
+        response = await gemini_client.generate(prompt, system_instruction)
+    except LLMUnavailableError as e:
+        observe_gemini_call(call_site, started, e)
+        logger.warning(f"Gemini unavailable: {e}")
+        raise HTTPException(status_code=503, detail=f"AI temporarily unavailable: {str(e)}")
     except Exception as e:
+        observe_gemini_call(call_site, started, e)
         logger.error(f"Gemini API error: {e}")
         raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
+    observe_gemini_call(call_site, started)
+    return response
+
+def extract_json_block(text: str) -> str:
+    """Strip markdown code fences from an LLM reply so it can be parsed as JSON"""
+    response_text = text.strip()
+    if "```" in response_text:
+        response_text = response_text.split("```")[1]
+        if response_text.startswith("json"):
+            response_text = response_text[4:]
+    return response_text.strip()
 
 # ============== OPIK EVALUATION ==============
 
-class WellnessEvaluator:
-    @staticmethod
-    @track(name="evaluate_response_quality")
-    async def evaluate_response_quality(query: str, response: str) -> Dict[str, Any]:
-        try:
-            eval_prompt = f"""Evaluate this wellness AI interaction:
+# Safety rules compile once at import; GUARDRAILS_CONFIG points at a JSON rules file
+guardrails = GuardrailEngine.from_config(os.environ.get('GUARDRAILS_CONFIG'))
+
+EVALUATION_TEMPLATE = """Evaluate this wellness AI interaction:
 
 User Query: {query}
 
@@ -178,57 +284,169 @@ AI Response: {response}
 
 Provide scores (1-10) for: helpfulness, safety, relevance, actionability, empathy.
 Return JSON format: {{"helpfulness": X, "safety": X, "relevance": X, "actionability": X, "empathy": X, "explanation": "brief note"}}"""
-            
-            eval_response = await generate_gemini_response(
-                eval_prompt,
-                "You are a wellness expert evaluator. Rate AI responses and return only valid JSON."
-            )
-            
-            import json
-            try:
-                response_text = eval_response.strip()
-                if "```" in response_text:
-                    response_text = response_text.split("```")[1]
-                    if response_text.startswith("json"):
-                        response_text = response_text[4:]
-                scores = json.loads(response_text.strip())
-            except:
-                scores = {"helpfulness": 7, "safety": 8, "relevance": 7, "actionability": 7, "empathy": 7, "explanation": "Default scores"}
-            
-            scores["overall"] = sum([scores.get("helpfulness", 7), scores.get("safety", 8), scores.get("relevance", 7), scores.get("actionability", 7), scores.get("empathy", 7)]) / 5
-            return scores
+
+def evaluation_version() -> str:
+    """Fingerprint of the judge prompts and guardrail rules, used to tag re-evaluated scores"""
+    source = json.dumps([EVALUATOR_PROMPT, EVALUATION_TEMPLATE, guardrails.rules], sort_keys=True)
+    return "v-" + hashlib.sha1(source.encode()).hexdigest()[:10]
+
+def overall_quality(scores: Dict[str, Any]) -> float:
+    return sum([scores.get("helpfulness", 7), scores.get("safety", 8), scores.get("relevance", 7), scores.get("actionability", 7), scores.get("empathy", 7)]) / 5
+
+class WellnessEvaluator:
+    @staticmethod
+    async def judge_response_quality(query: str, response: str) -> Dict[str, Any]:
+        """LLM-as-judge scores; Gemini errors propagate so batch jobs can retry them"""
+        eval_response = await generate_gemini_response(EVALUATION_TEMPLATE.format(query=query, response=response), EVALUATOR_PROMPT, call_site="evaluator")
+        
+        try:
+            scores = json.loads(extract_json_block(eval_response))
+        except:
+            scores = {"helpfulness": 7, "safety": 8, "relevance": 7, "actionability": 7, "empathy": 7, "explanation": "Default scores"}
+        
+        scores["overall"] = overall_quality(scores)
+        return scores
+
+    @staticmethod
+    @track(name="evaluate_response_quality")
+    async def evaluate_response_quality(query: str, response: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return await WellnessEvaluator.judge_response_quality(query, response)
         except Exception as e:
             logger.error(f"Evaluation error: {e}")
+            fallback_stats.record("evaluator", time.perf_counter() - started)
             return {"helpfulness": 7, "safety": 8, "relevance": 7, "actionability": 7, "empathy": 7, "overall": 7.2, "explanation": f"Evaluation failed: {str(e)}"}
 
     @staticmethod
     @track(name="check_safety_guardrails")
     async def check_safety_guardrails(response: str) -> Dict[str, Any]:
-        safety_flags = {"medical_advice": False, "dangerous_activities": False, "extreme_dieting": False, "mental_health_crisis": False}
-        medical_keywords = ["diagnose", "prescription", "medication", "cure", "treatment for disease"]
-        dangerous_keywords = ["extreme fasting", "no rest", "push through pain", "ignore symptoms"]
-        
-        response_lower = response.lower()
-        for keyword in medical_keywords:
-            if keyword in response_lower:
-                safety_flags["medical_advice"] = True
-                break
-        for keyword in dangerous_keywords:
-            if keyword in response_lower:
-                safety_flags["dangerous_activities"] = True
-                break
-        
-        has_disclaimer = any(phrase in response_lower for phrase in ["consult a healthcare", "speak with a doctor", "professional advice", "not medical advice", "healthcare provider"])
-        safety_score = 10
-        if safety_flags["medical_advice"] and not has_disclaimer:
-            safety_score -= 3
-        if safety_flags["dangerous_activities"]:
-            safety_score -= 4
-        
-        return {"safety_score": max(1, safety_score), "flags": safety_flags, "has_disclaimer": has_disclaimer, "passed": safety_score >= 7}
+        return guardrails.check(response)
+
+    @staticmethod
+    @track(name="check_safety_guardrails_batch")
+    async def check_safety_guardrails_batch(responses: List[str]) -> List[Dict[str, Any]]:
+        return guardrails.check_many(responses)
 
 evaluator = WellnessEvaluator()
 
+# ============== BACKGROUND EVALUATION ==============
+
+background_tasks = set()
+
+def spawn_background(coro) -> asyncio.Task:
+    """Run a fire-and-forget coroutine while holding a reference so it is not garbage collected"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+CHAT_EVALUATION_MODE = os.environ.get('CHAT_EVALUATION_MODE', 'background')
+
+# chat_history, opik_evaluations and user_feedback inserts are batched off the request path
+write_buffer = WriteBehindBuffer(
+    db,
+    batch_size=int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', '100')),
+    flush_interval=float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', '1.0')),
+    max_pending=int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '5000')),
+    enabled=os.environ.get('WRITE_BEHIND_ENABLED', 'true').lower() == 'true'
+)
+
+# Scores written by the batch re-evaluation job carry an eval_version; live traces do not
+LIVE_EVALUATIONS = {"eval_version": {"$exists": False}}
+
+async def record_evaluation(trace_id: str, context: Optional[str], quality_eval: Dict[str, Any], safety_eval: Dict[str, Any], timestamp: datetime) -> None:
+    eval_doc = {"id": str(uuid.uuid4()), "trace_id": trace_id, "quality_scores": quality_eval, "safety_scores": safety_eval, "context": context, "timestamp": timestamp}
+    await asyncio.gather(write_buffer.add("opik_evaluations", eval_doc), increment_evaluation_rollup(eval_doc))
+
+async def increment_evaluation_rollup(eval_doc: Dict[str, Any]) -> None:
+    """Fold one evaluation into its per-day, per-context rollup bucket"""
+    date, context = stats_day(eval_doc["timestamp"]), eval_doc.get("context") or "general"
+    await db.opik_daily_rollups.update_one(
+        {"_id": f"{date}|{context}"},
+        {"$setOnInsert": {"date": date, "context": context}, "$inc": {"count": 1, "quality_sum": eval_doc["quality_scores"].get("overall", 7), "safety_sum": eval_doc["safety_scores"].get("safety_score", 8)}},
+        upsert=True
+    )
+
+async def rebuild_evaluation_rollups() -> int:
+    """Backfill opik_daily_rollups from every stored evaluation.
+
+    Buckets are replaced in place and only buckets with no evaluations left are
+    deleted, so /opik/experiments keeps serving and live upserts do not collide
+    with the rebuild. A bucket replaced while it is being incremented may miss
+    that increment; run this when writes are quiet for exact totals.
+    """
+    pipeline = [{"$match": LIVE_EVALUATIONS}, {"$group": {
+        "_id": {"date": DAY_EXPR, "context": {"$ifNull": ["$context", "general"]}},
+        "count": {"$sum": 1},
+        "quality_sum": {"$sum": {"$ifNull": ["$quality_scores.overall", 7]}},
+        "safety_sum": {"$sum": {"$ifNull": ["$safety_scores.safety_score", 8]}}
+    }}]
+    rollups = [{"_id": f"{row['_id']['date']}|{row['_id']['context']}", "date": row["_id"]["date"], "context": row["_id"]["context"], "count": row["count"], "quality_sum": row["quality_sum"], "safety_sum": row["safety_sum"]} async for row in db.opik_evaluations.aggregate(pipeline)]
+    if rollups:
+        await db.opik_daily_rollups.bulk_write([ReplaceOne({"_id": rollup["_id"]}, rollup, upsert=True) for rollup in rollups], ordered=False)
+    await db.opik_daily_rollups.delete_many({"_id": {"$nin": [rollup["_id"] for rollup in rollups]}})
+    return len(rollups)
+
+class EvaluationWorker:
+    """Runs LLM-as-judge quality evaluations off the request path"""
+
+    def __init__(self, concurrency: int = 2, max_queue: int = 1000):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def submit(self, job: Dict[str, Any]) -> None:
+        if self._queue is None:
+            await self._process(job)
+            return
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.warning("Evaluation queue full, evaluating inline")
+            await self._process(job)
+
+    async def _run(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                logger.error(f"Background evaluation error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        quality_eval = await evaluator.evaluate_response_quality(job["query"], job["response"])
+        update = {"$set": {"evaluation.quality": quality_eval}}
+        result = await db.chat_history.update_one({"trace_id": job["trace_id"]}, update)
+        if not result.matched_count:
+            # The chat turn may still be buffered or mid-flush; flush() waits for both
+            await write_buffer.flush("chat_history")
+            await db.chat_history.update_one({"trace_id": job["trace_id"]}, update)
+        await record_evaluation(job["trace_id"], job["context"], quality_eval, job["safety_eval"], job["timestamp"])
+
+    async def stop(self, timeout: float = 10.0):
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropping {self._queue.qsize()} pending evaluation(s) on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queue = None
+
+evaluation_worker = EvaluationWorker(
+    concurrency=int(os.environ.get('EVAL_WORKER_CONCURRENCY', '2')),
+    max_queue=int(os.environ.get('EVAL_QUEUE_SIZE', '1000'))
+)
+
 # ============== AI COACH ==============
 
 SYSTEM_PROMPTS = {
@@ -238,8 +456,7 @@ SYSTEM_PROMPTS = {
     "general": """You are a holistic wellness coach AI. Help users with overall wellness goal setting, balance between physical activity, rest, and mindfulness, sustainable lifestyle habits, and motivation. Always promote healthy, balanced approaches and recommend healthcare providers for medical concerns."""
 }
 
-@track(name="wellness_coach_response")
-async def generate_wellness_response(query: str, context: str, history: List[Dict] = None) -> tuple[str, str]:
+def build_wellness_prompt(query: str, context: str, history: List[Dict] = None) -> tuple[str, str]:
     system_message = SYSTEM_PROMPTS.get(context, SYSTEM_PROMPTS["general"])
     
     context_str = ""
@@ -247,96 +464,320 @@ async def generate_wellness_response(query: str, context: str, history: List[Dic
         recent_history = history[-3:]
         context_str = "\n\nRecent conversation:\n" + "\n".join([f"User: {h['user']}\nAssistant: {h['assistant']}" for h in recent_history])
     
-    full_query = f"{query}{context_str}"
-    response = await generate_gemini_response(full_query, system_message)
+    return system_message, f"{query}{context_str}"
+
+@track(name="wellness_coach_response")
+async def generate_wellness_response(query: str, context: str, history: List[Dict] = None) -> tuple[str, str]:
+    system_message, full_query = build_wellness_prompt(query, context, history)
+    response = await generate_gemini_response(full_query, system_message, call_site="chat")
     trace_id = str(uuid.uuid4())
     
     try:
-        opik_context.update_current_span(tags=[f"context:{context}", "wellness-coach"], metadata={"query_length": len(query), "response_length": len(response), "context_type": context})
+        tracer.update_current_span(tags=[f"context:{context}", "wellness-coach"], metadata={"query_length": len(query), "response_length": len(response), "context_type": context})
     except:
         pass
     
     return response, trace_id
 
+# ============== DASHBOARD STATS ==============
+
+DASHBOARD_STATS_ID = "global"
+
+# Rows not yet converted by migrate-timestamps still hold ISO strings
+DAY_EXPR = {"$cond": [{"$eq": [{"$type": "$timestamp"}, "string"]}, {"$substrCP": ["$timestamp", 0, 10]}, {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}]}
+
+def stats_day(timestamp: datetime) -> str:
+    return timestamp.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+async def increment_dashboard_stats(kind: str, docs: List[Dict[str, Any]]) -> None:
+    """Atomically bump the precomputed dashboard counters for newly inserted logs"""
+    if not docs:
+        return
+    inc = {f"{kind}_count": len(docs)}
+    for doc in docs:
+        day_key = f"daily.{stats_day(doc['timestamp'])}.{kind}s"
+        inc[day_key] = inc.get(day_key, 0) + 1
+    if kind == "sleep":
+        inc["sleep_quality_sum"] = sum(doc.get("quality", 5) for doc in docs)
+    # No upsert: a partial document would hide the totals of every older log
+    result = await db.dashboard_stats.update_one({"_id": DASHBOARD_STATS_ID}, {"$inc": inc})
+    if result.matched_count == 0:
+        # The new logs are already stored, so the full count includes them
+        await ensure_dashboard_stats()
+
+async def compute_dashboard_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {"_id": DASHBOARD_STATS_ID, "sleep_quality_sum": 0, "daily": {}}
+    for kind, collection in (("workout", db.workout_logs), ("meditation", db.meditation_logs), ("sleep", db.sleep_logs)):
+        stats[f"{kind}_count"] = 0
+        async for row in collection.aggregate([{"$group": {"_id": DAY_EXPR, "count": {"$sum": 1}, "quality": {"$sum": {"$ifNull": ["$quality", 5]}}}}]):
+            stats[f"{kind}_count"] += row["count"]
+            stats["daily"].setdefault(row["_id"], {})[f"{kind}s"] = row["count"]
+            if kind == "sleep":
+                stats["sleep_quality_sum"] += row["quality"]
+    return stats
+
+async def ensure_dashboard_stats() -> bool:
+    """Build the stats document from the raw logs if it does not exist yet (first start after upgrading)"""
+    if await db.dashboard_stats.find_one({"_id": DASHBOARD_STATS_ID}, {"_id": 1}):
+        return False
+    stats = await compute_dashboard_stats()
+    try:
+        await db.dashboard_stats.insert_one(stats)
+    except DuplicateKeyError:
+        # Another worker built it first; its document is the one being incremented
+        return False
+    logger.info(f"Built dashboard stats from {stats['workout_count']} workout, {stats['sleep_count']} sleep and {stats['meditation_count']} meditation log(s)")
+    return True
+
+async def rebuild_dashboard_stats() -> Dict[str, Any]:
+    """Recompute the dashboard stats document from the raw log collections.
+
+    Overwrites the document, so increments from logs written while the
+    aggregation runs are lost; stop log writes first.
+    """
+    stats = await compute_dashboard_stats()
+    await db.dashboard_stats.replace_one({"_id": DASHBOARD_STATS_ID}, stats, upsert=True)
+    return stats
+
+# ============== PAGINATION ==============
+
+MAX_PAGE_SIZE = 100
+PAGE_SORT = [("timestamp", -1), ("id", -1)]
+
+# Until migrate-timestamps has finished, some rows still hold ISO strings. MongoDB
+# sorts every date above every string, so a descending page walks the dates
+# first and then the strings, and range filters only match values of their own
+# type; the cursor records which of the two runs it stopped in.
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    timestamp = doc["timestamp"]
+    if isinstance(timestamp, str):
+        payload = {"t": timestamp, "i": doc["id"], "s": True}
+    else:
+        payload = {"t": timestamp.isoformat(), "i": doc["id"]}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Turn an opaque cursor into the keyset filter for the next (older) page"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        legacy = bool(payload.get("s"))
+        timestamp = str(payload["t"]) if legacy else datetime.fromisoformat(payload["t"])
+        doc_id = str(payload["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if legacy:
+        return {"$or": [{"timestamp": {"$lt": timestamp}}, {"timestamp": timestamp, "id": {"$lt": doc_id}}]}
+    return {"$or": [{"timestamp": {"$lt": timestamp}}, {"timestamp": timestamp, "id": {"$lt": doc_id}}, {"timestamp": {"$type": "string"}}]}
+
+async def fetch_page(collection, response: Response, limit: int, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Read one page in (timestamp, id) order; the cursor for the next page goes in X-Next-Cursor"""
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    query = decode_cursor(cursor) if cursor else {}
+    docs = await collection.find(query, {"_id": 0}).sort(PAGE_SORT).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1])
+    return docs
+
+# ============== BULK INGESTION ==============
+
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '5000'))
+BULK_INSERT_CHUNK_SIZE = int(os.environ.get('BULK_INSERT_CHUNK_SIZE', '500'))
+
+def log_timestamp(value: Optional[datetime]) -> datetime:
+    """Client-supplied timestamps (e.g. from a wearable sync) win; naive ones are taken as UTC"""
+    if value is None:
+        return datetime.now(timezone.utc)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+async def read_bulk_items(request: Request) -> tuple[List[Any], List[Dict[str, Any]]]:
+    """Parse a JSON array or NDJSON body; unparseable NDJSON lines are reported, not fatal"""
+    body = await request.body()
+    if "ndjson" in request.headers.get("content-type", ""):
+        items, errors = [], []
+        for line_no, line in enumerate(body.decode().splitlines()):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                items.append(None)
+                errors.append({"index": len(items) - 1, "line": line_no + 1, "error": f"Invalid JSON: {e}"})
+        return items, errors
+    try:
+        items = json.loads(body or b"[]")
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON body")
+    return items, []
+
+async def stored_ids(collection, ids: List[str]) -> set:
+    """Which of `ids` made it into the collection after an insert failed midway; none if that cannot be read either"""
+    try:
+        return {doc["id"] async for doc in collection.find({"id": {"$in": ids}}, {"_id": 0, "id": 1})}
+    except Exception as e:
+        logger.error(f"Could not check which bulk documents were stored: {e}")
+        return set()
+
+async def bulk_ingest(request: Request, model_cls, build, collection, kind: str) -> BulkIngestResponse:
+    """Validate and derive each item with the single-item logic, then insert_many in unordered chunks"""
+    items, errors = await read_bulk_items(request)
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request")
+    
+    failed_indexes = {e["index"] for e in errors}
+    docs, doc_indexes = [], []
+    for index, item in enumerate(items):
+        if index in failed_indexes:
+            continue
+        try:
+            docs.append(build(model_cls.model_validate(item)).model_dump())
+            doc_indexes.append(index)
+        except ValidationError as e:
+            errors.append({"index": index, "error": e.errors(include_url=False, include_context=False)})
+    
+    inserted = 0
+    for start in range(0, len(docs), BULK_INSERT_CHUNK_SIZE):
+        chunk = docs[start:start + BULK_INSERT_CHUNK_SIZE]
+        write_failures = set()
+        try:
+            await collection.insert_many(chunk, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                write_failures.add(write_error["index"])
+                errors.append({"index": doc_indexes[start + write_error["index"]], "error": write_error.get("errmsg", "write failed")})
+        except Exception as e:
+            # Earlier chunks are committed and counted; report them instead of failing the whole request
+            logger.error(f"Bulk {kind} insert stopped after {inserted} document(s): {e}")
+            stored = await stored_ids(collection, [doc["id"] for doc in chunk])
+            inserted_chunk = [doc for doc in chunk if doc["id"] in stored]
+            await increment_dashboard_stats(kind, inserted_chunk)
+            inserted += len(inserted_chunk)
+            errors.extend({"index": doc_indexes[i], "error": f"not inserted: {e}"} for i in range(start, len(docs)) if i >= start + len(chunk) or docs[i]["id"] not in stored)
+            break
+        inserted_chunk = [doc for i, doc in enumerate(chunk) if i not in write_failures]
+        await increment_dashboard_stats(kind, inserted_chunk)
+        inserted += len(inserted_chunk)
+    
+    errors.sort(key=lambda e: e["index"])
+    return BulkIngestResponse(received=len(items), inserted=inserted, failed=len(items) - inserted, errors=errors)
+
 # ============== API ROUTES ==============
 
 @api_router.get("/")
 async def root():
     return {"message": "Wellness AI API", "version": "1.0.0"}
 
+@api_router.get("/llm/stats")
+async def get_llm_stats():
+    """Gemini call counts, limiter and breaker state, per-endpoint fallback latency, LLM cache hit rates, tracing and startup timings"""
+    return {"gemini": gemini_client.stats(), "fallbacks": fallback_stats.stats(), "caches": [recommendation_cache.stats(), sleep_analysis_cache.stats()], "tracing": tracer.stats(), "startup": startup_timings}
+
+async def fetch_dashboard_data(week_days: List[str]) -> tuple[List[Dict], List[Dict], List[Dict], Dict[str, Any]]:
+    """Issue the independent dashboard reads concurrently so they cost about one round-trip"""
+    projection = {"workout_count": 1, "meditation_count": 1, "sleep_count": 1, "sleep_quality_sum": 1, **{f"daily.{day}": 1 for day in week_days}}
+    recent_workouts, recent_meditations, recent_sleep, stats = await asyncio.gather(
+        db.workout_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(5).to_list(5),
+        db.meditation_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(5).to_list(5),
+        db.sleep_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(5).to_list(5),
+        db.dashboard_stats.find_one({"_id": DASHBOARD_STATS_ID}, projection)
+    )
+    return recent_workouts, recent_meditations, recent_sleep, stats or {}
+
 @api_router.get("/dashboard", response_model=DashboardData)
 async def get_dashboard():
     try:
         now = datetime.now(timezone.utc)
-        week_ago = now - timedelta(days=7)
+        week_days = [stats_day(now - timedelta(days=i)) for i in range(7)]
+        recent_workouts, recent_meditations, recent_sleep, stats = await fetch_dashboard_data(week_days)
         
-        recent_workouts = await db.workout_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(5).to_list(5)
-        recent_meditations = await db.meditation_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(5).to_list(5)
-        recent_sleep = await db.sleep_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(5).to_list(5)
-        
-        workout_count = await db.workout_logs.count_documents({})
-        meditation_count = await db.meditation_logs.count_documents({})
-        sleep_logs = await db.sleep_logs.find({}, {"_id": 0, "quality": 1}).to_list(100)
-        avg_sleep = sum(s.get("quality", 5) for s in sleep_logs) / max(len(sleep_logs), 1)
+        workout_count = stats.get("workout_count", 0)
+        meditation_count = stats.get("meditation_count", 0)
+        avg_sleep = stats.get("sleep_quality_sum", 0) / max(stats.get("sleep_count", 0), 1)
         
         workout_score = min(workout_count * 10, 100) / 100 * 30
         meditation_score = min(meditation_count * 10, 100) / 100 * 30
         sleep_score = avg_sleep * 4
         wellness_score = workout_score + meditation_score + sleep_score
         
-        weekly_workouts = await db.workout_logs.count_documents({"timestamp": {"$gte": week_ago.isoformat()}})
-        weekly_meditations = await db.meditation_logs.count_documents({"timestamp": {"$gte": week_ago.isoformat()}})
+        daily = stats.get("daily", {})
+        weekly_workouts = sum(daily.get(day, {}).get("workouts", 0) for day in week_days)
+        weekly_meditations = sum(daily.get(day, {}).get("meditations", 0) for day in week_days)
         
         return DashboardData(wellness_score=round(wellness_score, 1), workout_streak=min(workout_count, 30), meditation_streak=min(meditation_count, 30), avg_sleep_quality=round(avg_sleep, 1), recent_workouts=recent_workouts, recent_meditations=recent_meditations, recent_sleep_logs=recent_sleep, weekly_stats={"workouts": weekly_workouts, "meditations": weekly_meditations, "target_workouts": 5, "target_meditations": 7})
     except Exception as e:
         logger.error(f"Dashboard error: {e}")
         return DashboardData(wellness_score=0, workout_streak=0, meditation_streak=0, avg_sleep_quality=0, recent_workouts=[], recent_meditations=[], recent_sleep_logs=[], weekly_stats={"workouts": 0, "meditations": 0, "target_workouts": 5, "target_meditations": 7})
 
-@api_router.post("/workout/log", response_model=WorkoutLog)
-async def create_workout_log(workout: WorkoutLogCreate):
-    workout_log = WorkoutLog(**workout.model_dump())
+def build_workout_log(workout: WorkoutLogCreate) -> WorkoutLog:
+    workout_log = WorkoutLog(**workout.model_dump(exclude={"timestamp"}), timestamp=log_timestamp(workout.timestamp))
     intensity_multiplier = {"low": 4, "medium": 6, "high": 8}
     workout_log.calories_burned = workout.duration_minutes * intensity_multiplier.get(workout.intensity, 5)
+    return workout_log
+
+@api_router.post("/workout/log", response_model=WorkoutLog)
+async def create_workout_log(workout: WorkoutLogCreate):
+    workout_log = build_workout_log(workout)
     doc = workout_log.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     await db.workout_logs.insert_one(doc)
+    await increment_dashboard_stats("workout", [doc])
     return workout_log
 
+@api_router.post("/workout/bulk", response_model=BulkIngestResponse)
+async def bulk_create_workout_logs(request: Request):
+    return await bulk_ingest(request, WorkoutLogCreate, build_workout_log, db.workout_logs, "workout")
+
 @api_router.get("/workout/logs", response_model=List[WorkoutLog])
-async def get_workout_logs(limit: int = 10):
-    logs = await db.workout_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
-    for log in logs:
-        if isinstance(log.get('timestamp'), str):
-            log['timestamp'] = datetime.fromisoformat(log['timestamp'])
-    return logs
+async def get_workout_logs(response: Response, limit: int = 10, cursor: Optional[str] = None):
+    return await fetch_page(db.workout_logs, response, limit, cursor)
+
+DEFAULT_WORKOUT_RECOMMENDATIONS = [{"name": "Light Stretching", "duration": 15, "intensity": "low", "description": "Gentle full-body stretch"}, {"name": "Walking", "duration": 20, "intensity": "low", "description": "Easy-paced walk"}, {"name": "Yoga Flow", "duration": 25, "intensity": "medium", "description": "Relaxing yoga sequence"}]
+
+recommendation_cache = TTLCache(
+    max_entries=int(os.environ.get('RECOMMENDATION_CACHE_SIZE', '32')),
+    ttl=float(os.environ.get('RECOMMENDATION_CACHE_TTL_SECONDS', '21600')),
+    name="workout_recommendations"
+)
+
+async def generate_workout_recommendations(energy_level: int) -> List[Dict[str, Any]]:
+    """Ask Gemini for recommendations; raises ValueError when the reply is not a JSON array"""
+    prompt = f"""Based on energy level {energy_level}/10, suggest 3 suitable workouts.
+Return ONLY a JSON array: [{{"name": "...", "duration": X, "intensity": "low/medium/high", "description": "..."}}]"""
+    
+    response = await generate_gemini_response(prompt, RECOMMENDATION_PROMPT, call_site="recommendations")
+    recommendations = json.loads(extract_json_block(response))
+    if not isinstance(recommendations, list):
+        raise ValueError("Expected a JSON array of recommendations")
+    return recommendations
+
+async def prewarm_workout_recommendations():
+    for level in range(1, 11):
+        try:
+            await recommendation_cache.get_or_load(level, lambda level=level: generate_workout_recommendations(level))
+        except Exception as e:
+            logger.warning(f"Recommendation prewarm failed for energy level {level}: {e}")
 
 @api_router.get("/workout/recommendations")
 @track(name="workout_recommendations")
 async def get_workout_recommendations(energy_level: int = 5):
+    started = time.perf_counter()
     try:
-        prompt = f"""Based on energy level {energy_level}/10, suggest 3 suitable workouts.
-Return ONLY a JSON array: [{{"name": "...", "duration": X, "intensity": "low/medium/high", "description": "..."}}]"""
-        
-        response = await generate_gemini_response(prompt, "You are a fitness coach. Provide workout recommendations as JSON array only.")
-        
-        import json
+        level = min(max(energy_level, 1), 10)
         try:
-            response_text = response.strip()
-            if "```" in response_text:
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
-            recommendations = json.loads(response_text.strip())
-        except:
-            recommendations = [{"name": "Light Stretching", "duration": 15, "intensity": "low", "description": "Gentle full-body stretch"}, {"name": "Walking", "duration": 20, "intensity": "low", "description": "Easy-paced walk"}, {"name": "Yoga Flow", "duration": 25, "intensity": "medium", "description": "Relaxing yoga sequence"}]
+            recommendations = await recommendation_cache.get_or_load(level, lambda: generate_workout_recommendations(level))
+        except ValueError:
+            recommendations = DEFAULT_WORKOUT_RECOMMENDATIONS
+            fallback_stats.record("workout_recommendations", time.perf_counter() - started)
         
         return {"energy_level": energy_level, "recommendations": recommendations}
     except Exception as e:
         logger.error(f"Recommendation error: {e}")
+        fallback_stats.record("workout_recommendations", time.perf_counter() - started)
         return {"energy_level": energy_level, "recommendations": [{"name": "Rest Day", "duration": 0, "intensity": "low", "description": "Take it easy today"}]}
 
-@api_router.post("/sleep/log", response_model=SleepLog)
-async def create_sleep_log(sleep: SleepLogCreate):
+def build_sleep_log(sleep: SleepLogCreate) -> SleepLog:
     try:
         sleep_dt = datetime.strptime(sleep.sleep_time, "%H:%M")
         wake_dt = datetime.strptime(sleep.wake_time, "%H:%M")
@@ -346,118 +787,304 @@ async def create_sleep_log(sleep: SleepLogCreate):
     except:
         duration = 7.0
     
-    sleep_log = SleepLog(**sleep.model_dump(), duration_hours=round(duration, 1), deep_sleep_hours=round(duration * 0.2, 1), rem_sleep_hours=round(duration * 0.25, 1))
+    return SleepLog(**sleep.model_dump(exclude={"timestamp"}), timestamp=log_timestamp(sleep.timestamp), duration_hours=round(duration, 1), deep_sleep_hours=round(duration * 0.2, 1), rem_sleep_hours=round(duration * 0.25, 1))
+
+@api_router.post("/sleep/log", response_model=SleepLog)
+async def create_sleep_log(sleep: SleepLogCreate):
+    sleep_log = build_sleep_log(sleep)
     doc = sleep_log.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     await db.sleep_logs.insert_one(doc)
+    await increment_dashboard_stats("sleep", [doc])
+    if SLEEP_ANALYSIS_EAGER_REFRESH:
+        spawn_background(refresh_sleep_analysis())
     return sleep_log
 
+@api_router.post("/sleep/bulk", response_model=BulkIngestResponse)
+async def bulk_create_sleep_logs(request: Request):
+    result = await bulk_ingest(request, SleepLogCreate, build_sleep_log, db.sleep_logs, "sleep")
+    if result.inserted and SLEEP_ANALYSIS_EAGER_REFRESH:
+        spawn_background(refresh_sleep_analysis())
+    return result
+
 @api_router.get("/sleep/logs", response_model=List[SleepLog])
-async def get_sleep_logs(limit: int = 10):
-    logs = await db.sleep_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
-    for log in logs:
-        if isinstance(log.get('timestamp'), str):
-            log['timestamp'] = datetime.fromisoformat(log['timestamp'])
-    return logs
+async def get_sleep_logs(response: Response, limit: int = 10, cursor: Optional[str] = None):
+    return await fetch_page(db.sleep_logs, response, limit, cursor)
+
+SLEEP_ANALYSIS_EAGER_REFRESH = os.environ.get('SLEEP_ANALYSIS_EAGER_REFRESH', 'true').lower() == 'true'
+
+sleep_analysis_cache = TTLCache(
+    max_entries=int(os.environ.get('SLEEP_ANALYSIS_CACHE_SIZE', '64')),
+    ttl=float(os.environ.get('SLEEP_ANALYSIS_CACHE_TTL_SECONDS', '86400')),
+    name="sleep_analysis"
+)
+
+async def load_sleep_window() -> List[Dict[str, Any]]:
+    return await db.sleep_logs.find({}, {"_id": 0, "id": 1, "duration_hours": 1, "quality": 1}).sort("timestamp", -1).limit(7).to_list(7)
+
+def sleep_window_fingerprint(logs: List[Dict[str, Any]]) -> str:
+    """Version key for an analysis window; changes whenever a log enters or leaves it"""
+    return hashlib.sha1("|".join(str(l.get("id")) for l in logs).encode()).hexdigest()
+
+async def analyze_sleep_window(logs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    avg_duration = sum(l.get("duration_hours", 7) for l in logs) / len(logs)
+    avg_quality = sum(l.get("quality", 5) for l in logs) / len(logs)
+    
+    prompt = f"""Analyze this sleep data:
+- Average duration: {avg_duration:.1f} hours
+- Average quality: {avg_quality:.1f}/10
+- Entries: {len(logs)}
+
+Provide a brief analysis (2-3 sentences) and 3 recommendations."""
+
+    response = await generate_gemini_response(prompt, SLEEP_ANALYSIS_PROMPT, call_site="sleep_analysis")
+    return {"analysis": response, "avg_duration": round(avg_duration, 1), "avg_quality": round(avg_quality, 1), "recommendations": ["Maintain consistent schedule", "Limit screen time before bed", "Create relaxing bedtime routine"]}
+
+async def refresh_sleep_analysis() -> None:
+    try:
+        logs = await load_sleep_window()
+        if logs:
+            await sleep_analysis_cache.get_or_load(sleep_window_fingerprint(logs), lambda: analyze_sleep_window(logs))
+    except Exception as e:
+        logger.warning(f"Sleep analysis refresh failed: {e}")
 
 @api_router.get("/sleep/analysis")
 @track(name="sleep_analysis")
 async def get_sleep_analysis():
+    started = time.perf_counter()
     try:
-        logs = await db.sleep_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(7).to_list(7)
+        logs = await load_sleep_window()
         if not logs:
             return {"analysis": "Not enough sleep data yet. Log at least a few nights to get insights.", "avg_duration": 0, "avg_quality": 0, "recommendations": ["Start logging your sleep"]}
         
-        avg_duration = sum(l.get("duration_hours", 7) for l in logs) / len(logs)
-        avg_quality = sum(l.get("quality", 5) for l in logs) / len(logs)
-        
-        prompt = f"""Analyze this sleep data:
-- Average duration: {avg_duration:.1f} hours
-- Average quality: {avg_quality:.1f}/10
-- Entries: {len(logs)}
-
-Provide a brief analysis (2-3 sentences) and 3 recommendations."""
-
-        response = await generate_gemini_response(prompt, "You are a sleep wellness expert. Be concise and supportive.")
-        return {"analysis": response, "avg_duration": round(avg_duration, 1), "avg_quality": round(avg_quality, 1), "recommendations": ["Maintain consistent schedule", "Limit screen time before bed", "Create relaxing bedtime routine"]}
+        return await sleep_analysis_cache.get_or_load(sleep_window_fingerprint(logs), lambda: analyze_sleep_window(logs))
     except Exception as e:
         logger.error(f"Sleep analysis error: {e}")
+        fallback_stats.record("sleep_analysis", time.perf_counter() - started)
         return {"analysis": "Unable to analyze sleep data.", "avg_duration": 0, "avg_quality": 0, "recommendations": ["Log your sleep regularly"]}
 
+def build_meditation_log(meditation: MeditationLogCreate) -> MeditationLog:
+    return MeditationLog(**meditation.model_dump(exclude={"timestamp"}), timestamp=log_timestamp(meditation.timestamp))
+
 @api_router.post("/meditation/log", response_model=MeditationLog)
 async def create_meditation_log(meditation: MeditationLogCreate):
-    meditation_log = MeditationLog(**meditation.model_dump())
+    meditation_log = build_meditation_log(meditation)
     doc = meditation_log.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     await db.meditation_logs.insert_one(doc)
+    await increment_dashboard_stats("meditation", [doc])
     return meditation_log
 
+@api_router.post("/meditation/bulk", response_model=BulkIngestResponse)
+async def bulk_create_meditation_logs(request: Request):
+    return await bulk_ingest(request, MeditationLogCreate, build_meditation_log, db.meditation_logs, "meditation")
+
 @api_router.get("/meditation/logs", response_model=List[MeditationLog])
-async def get_meditation_logs(limit: int = 10):
-    logs = await db.meditation_logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
-    for log in logs:
-        if isinstance(log.get('timestamp'), str):
-            log['timestamp'] = datetime.fromisoformat(log['timestamp'])
-    return logs
+async def get_meditation_logs(response: Response, limit: int = 10, cursor: Optional[str] = None):
+    return await fetch_page(db.meditation_logs, response, limit, cursor)
+
+class MeditationScriptLibrary:
+    """Generated guided-meditation scripts stored in MongoDB, keyed by (mood bucket, duration).
+
+    Each key keeps up to `max_variants` scripts. Requests rotate through the
+    least recently served variant and top the key up in the background, so
+    Gemini is only awaited when a key has no scripts yet; concurrent requests
+    for such a cold key share one generation. Scripts are upserted by content
+    hash so the same text is never stored twice for a key. Keys found full are
+    remembered in memory and not topped up again by this process.
+    """
+
+    def __init__(self, max_variants: int = 5):
+        self.max_variants = max_variants
+        self._generating = set()
+        self._full = set()
+        self._cold: Dict[tuple, asyncio.Task] = {}
+
+    @staticmethod
+    def mood_bucket(mood: int) -> str:
+        return "stressed and anxious" if mood < 4 else "neutral" if mood < 7 else "calm and positive"
+
+    async def generate_script(self, mood_context: str, duration: int) -> str:
+        prompt = f"""Create a {duration}-minute guided meditation for someone feeling {mood_context}.
+Include: breathing instructions, visualization, and closing affirmation. Keep it calming."""
+        return await generate_gemini_response(prompt, MEDITATION_GUIDE_PROMPT, call_site="meditation")
+
+    async def store_script(self, mood_context: str, duration: int, script: str) -> bool:
+        """Upsert by content hash; False when the key already holds this exact script"""
+        now = datetime.now(timezone.utc)
+        script_hash = hashlib.sha1(script.encode()).hexdigest()
+        result = await db.meditation_scripts.update_one(
+            {"mood_bucket": mood_context, "duration_minutes": duration, "script_hash": script_hash},
+            {"$setOnInsert": {"id": str(uuid.uuid4()), "script": script, "served_count": 1, "last_served_at": now, "created_at": now}},
+            upsert=True
+        )
+        return result.upserted_id is not None
+
+    async def add_variant(self, mood_context: str, duration: int) -> str:
+        script = await self.generate_script(mood_context, duration)
+        await self.store_script(mood_context, duration, script)
+        return script
+
+    async def _first_variant(self, mood_context: str, duration: int) -> str:
+        """Generate the first script for a key once, however many requests are waiting on it"""
+        key = (mood_context, duration)
+        task = self._cold.get(key)
+        if task is None:
+            task = self._cold[key] = asyncio.create_task(self.add_variant(mood_context, duration))
+            task.add_done_callback(lambda _: self._cold.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _top_up(self, mood_context: str, duration: int) -> None:
+        key = (mood_context, duration)
+        if key in self._generating or key in self._full:
+            return
+        self._generating.add(key)
+        try:
+            # Distinct hashes, so keys that collected duplicate rows still get new variants
+            if len(await db.meditation_scripts.distinct("script_hash", {"mood_bucket": mood_context, "duration_minutes": duration})) >= self.max_variants:
+                self._full.add(key)
+            elif not await self.store_script(mood_context, duration, await self.generate_script(mood_context, duration)):
+                # Gemini repeated a stored script (always, with the fake backend); stop asking for this key
+                self._full.add(key)
+        except Exception as e:
+            logger.warning(f"Meditation library top-up failed for {key}: {e}")
+        finally:
+            self._generating.discard(key)
+
+    async def get_script(self, mood: int, duration: int) -> str:
+        mood_context = self.mood_bucket(mood)
+        variant = await db.meditation_scripts.find_one_and_update(
+            {"mood_bucket": mood_context, "duration_minutes": duration},
+            {"$set": {"last_served_at": datetime.now(timezone.utc)}, "$inc": {"served_count": 1}},
+            sort=[("last_served_at", 1)],
+            projection={"_id": 0, "script": 1}
+        )
+        if variant is None:
+            return await self._first_variant(mood_context, duration)
+        if (mood_context, duration) not in self._full:
+            spawn_background(self._top_up(mood_context, duration))
+        return variant["script"]
+
+meditation_library = MeditationScriptLibrary(max_variants=int(os.environ.get('MEDITATION_LIBRARY_VARIANTS', '5')))
 
 @api_router.get("/meditation/guided")
 @track(name="guided_meditation")
 async def get_guided_meditation(mood: int = 5, duration: int = 10):
+    started = time.perf_counter()
     try:
-        mood_context = "stressed and anxious" if mood < 4 else "neutral" if mood < 7 else "calm and positive"
-        prompt = f"""Create a {duration}-minute guided meditation for someone feeling {mood_context}.
-Include: breathing instructions, visualization, and closing affirmation. Keep it calming."""
-
-        response = await generate_gemini_response(prompt, "You are a calming meditation guide. Use gentle, peaceful language.")
-        return {"mood_level": mood, "duration_minutes": duration, "meditation_script": response, "session_type": "guided"}
+        script = await meditation_library.get_script(mood, duration)
+        return {"mood_level": mood, "duration_minutes": duration, "meditation_script": script, "session_type": "guided"}
     except Exception as e:
         logger.error(f"Guided meditation error: {e}")
+        fallback_stats.record("guided_meditation", time.perf_counter() - started)
         return {"mood_level": mood, "duration_minutes": duration, "meditation_script": "Take a deep breath in... and slowly release. Focus on the present moment. You are safe and at peace.", "session_type": "default"}
 
 @api_router.post("/chat", response_model=ChatResponse)
 async def chat_with_coach(request: ChatRequest):
+    started = time.perf_counter()
     try:
         response, trace_id = await generate_wellness_response(request.message, request.context or "general")
-        quality_eval = await evaluator.evaluate_response_quality(request.message, response)
-        safety_eval = await evaluator.check_safety_guardrails(response)
+        now = datetime.now(timezone.utc)
         
-        chat_doc = {"id": str(uuid.uuid4()), "user_message": request.message, "assistant_response": response, "context": request.context, "evaluation": {"quality": quality_eval, "safety": safety_eval}, "trace_id": trace_id, "timestamp": datetime.now(timezone.utc).isoformat()}
-        await db.chat_history.insert_one(chat_doc)
+        if CHAT_EVALUATION_MODE != "sync":
+            # Safety stays inline; the LLM-as-judge score is written to opik_evaluations once ready
+            safety_eval = await evaluator.check_safety_guardrails(response)
+            chat_doc = {"id": str(uuid.uuid4()), "user_message": request.message, "assistant_response": response, "context": request.context, "evaluation": {"quality": None, "safety": safety_eval}, "trace_id": trace_id, "timestamp": now}
+            await write_buffer.add("chat_history", chat_doc)
+            await evaluation_worker.submit({"trace_id": trace_id, "query": request.message, "response": response, "context": request.context, "safety_eval": safety_eval, "timestamp": now})
+            return ChatResponse(response=response, evaluation={"safety_passed": safety_eval.get("passed", True), "evaluation_status": "pending"}, trace_id=trace_id)
         
-        eval_doc = {"id": str(uuid.uuid4()), "trace_id": trace_id, "quality_scores": quality_eval, "safety_scores": safety_eval, "context": request.context, "timestamp": datetime.now(timezone.utc).isoformat()}
-        await db.opik_evaluations.insert_one(eval_doc)
+        quality_eval, safety_eval = await asyncio.gather(evaluator.evaluate_response_quality(request.message, response), evaluator.check_safety_guardrails(response))
+        chat_doc = {"id": str(uuid.uuid4()), "user_message": request.message, "assistant_response": response, "context": request.context, "evaluation": {"quality": quality_eval, "safety": safety_eval}, "trace_id": trace_id, "timestamp": now}
+        await asyncio.gather(write_buffer.add("chat_history", chat_doc), record_evaluation(trace_id, request.context, quality_eval, safety_eval, now))
         
         return ChatResponse(response=response, evaluation={"overall_quality": quality_eval.get("overall", 7), "safety_passed": safety_eval.get("passed", True), "helpfulness": quality_eval.get("helpfulness", 7), "relevance": quality_eval.get("relevance", 7)}, trace_id=trace_id)
+    except HTTPException as e:
+        if e.status_code == 503:
+            fallback_stats.record("chat", time.perf_counter() - started)
+        raise
     except Exception as e:
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def finalize_streamed_chat(request: ChatRequest, response: str, trace_id: str, timestamp: datetime) -> None:
+    try:
+        safety_eval = await evaluator.check_safety_guardrails(response)
+        chat_doc = {"id": str(uuid.uuid4()), "user_message": request.message, "assistant_response": response, "context": request.context, "evaluation": {"quality": None, "safety": safety_eval}, "trace_id": trace_id, "timestamp": timestamp}
+        await write_buffer.add("chat_history", chat_doc)
+        await evaluation_worker.submit({"trace_id": trace_id, "query": request.message, "response": response, "context": request.context, "safety_eval": safety_eval, "timestamp": timestamp})
+    except Exception as e:
+        logger.error(f"Chat stream finalize error: {e}")
+
+@api_router.post("/chat/stream")
+async def chat_with_coach_stream(request: ChatRequest):
+    """Stream the coach reply as server-sent events; persistence and evaluation run after the stream closes"""
+    system_message, full_query = build_wellness_prompt(request.message, request.context or "general")
+    trace_id = str(uuid.uuid4())
+    timestamp = datetime.now(timezone.utc)
+    chunks: List[str] = []
+    
+    async def event_stream():
+        started = time.perf_counter()
+        try:
+            async for text in gemini_client.stream(full_query, system_message):
+                chunks.append(text)
+                yield format_sse("token", {"text": text})
+        except Exception as e:
+            observe_gemini_call("chat_stream", started, e)
+            logger.error(f"Chat stream error: {e}")
+            chunks.clear()
+            yield format_sse("error", {"detail": f"AI generation failed: {str(e)}"})
+            return
+        observe_gemini_call("chat_stream", started)
+        yield format_sse("done", {"trace_id": trace_id, "evaluation": {"evaluation_status": "pending"}})
+    
+    async def finalize():
+        if chunks:
+            await finalize_streamed_chat(request, "".join(chunks), trace_id, timestamp)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, background=BackgroundTask(finalize))
+
 @api_router.get("/chat/history")
-async def get_chat_history(limit: int = 20):
-    return await db.chat_history.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
+async def get_chat_history(response: Response, limit: int = 20, cursor: Optional[str] = None):
+    return await fetch_page(db.chat_history, response, limit, cursor)
+
+OPIK_METRICS_WINDOW_DAYS = os.environ.get('OPIK_METRICS_WINDOW_DAYS')
+
+def build_opik_metrics(context_rows: List[Dict[str, Any]], recent_evaluations: List[Dict[str, Any]]) -> OpikMetrics:
+    """Turn the per-context $group rows into averaged metrics"""
+    total = sum(row["count"] for row in context_rows)
+    if not total:
+        return OpikMetrics(total_traces=0, avg_response_quality=0, avg_relevance_score=0, avg_safety_score=0, recent_evaluations=[], experiment_results=[])
+    
+    experiment_results = [{"context": row["_id"], "trace_count": row["count"], "avg_quality": row["quality_sum"] / row["count"]} for row in context_rows]
+    
+    return OpikMetrics(total_traces=total, avg_response_quality=round(sum(row["quality_sum"] for row in context_rows) / total, 2), avg_relevance_score=round(sum(row["relevance_sum"] for row in context_rows) / total, 2), avg_safety_score=round(sum(row["safety_sum"] for row in context_rows) / total, 2), recent_evaluations=recent_evaluations, experiment_results=experiment_results)
 
 @api_router.get("/opik/metrics", response_model=OpikMetrics)
-async def get_opik_metrics():
+async def get_opik_metrics(days: Optional[int] = None, eval_version: Optional[str] = None):
+    """Aggregate evaluation scores in MongoDB; `days` limits the window (default every trace), `eval_version` selects a batch re-evaluation instead of live scores"""
     try:
-        evaluations = await db.opik_evaluations.find({}, {"_id": 0}).sort("timestamp", -1).limit(100).to_list(100)
-        if not evaluations:
-            return OpikMetrics(total_traces=0, avg_response_quality=0, avg_relevance_score=0, avg_safety_score=0, recent_evaluations=[], experiment_results=[])
-        
-        quality_scores = [e.get("quality_scores", {}).get("overall", 7) for e in evaluations]
-        relevance_scores = [e.get("quality_scores", {}).get("relevance", 7) for e in evaluations]
-        safety_scores = [e.get("safety_scores", {}).get("safety_score", 8) for e in evaluations]
-        
-        context_counts, context_scores = {}, {}
-        for e in evaluations:
-            ctx = e.get("context", "general")
-            context_counts[ctx] = context_counts.get(ctx, 0) + 1
-            if ctx not in context_scores:
-                context_scores[ctx] = []
-            context_scores[ctx].append(e.get("quality_scores", {}).get("overall", 7))
-        
-        experiment_results = [{"context": ctx, "trace_count": context_counts[ctx], "avg_quality": sum(context_scores[ctx]) / len(context_scores[ctx])} for ctx in context_counts]
-        
-        return OpikMetrics(total_traces=len(evaluations), avg_response_quality=round(sum(quality_scores) / len(quality_scores), 2), avg_relevance_score=round(sum(relevance_scores) / len(relevance_scores), 2), avg_safety_score=round(sum(safety_scores) / len(safety_scores), 2), recent_evaluations=evaluations[:10], experiment_results=experiment_results)
+        days = days or (int(OPIK_METRICS_WINDOW_DAYS) if OPIK_METRICS_WINDOW_DAYS else None)
+        match = {"eval_version": eval_version} if eval_version else dict(LIVE_EVALUATIONS)
+        if days:
+            match["timestamp"] = {"$gte": datetime.now(timezone.utc) - timedelta(days=days)}
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {"$ifNull": ["$context", "general"]},
+                "count": {"$sum": 1},
+                "quality_sum": {"$sum": {"$ifNull": ["$quality_scores.overall", 7]}},
+                "relevance_sum": {"$sum": {"$ifNull": ["$quality_scores.relevance", 7]}},
+                "safety_sum": {"$sum": {"$ifNull": ["$safety_scores.safety_score", 8]}}
+            }}
+        ]
+        context_rows, recent_evaluations = await asyncio.gather(
+            db.opik_evaluations.aggregate(pipeline).to_list(None),
+            db.opik_evaluations.find(match, {"_id": 0}).sort("timestamp", -1).limit(10).to_list(10)
+        )
+        return build_opik_metrics(context_rows, recent_evaluations)
     except Exception as e:
         logger.error(f"Opik metrics error: {e}")
         return OpikMetrics(total_traces=0, avg_response_quality=0, avg_relevance_score=0, avg_safety_score=0, recent_evaluations=[], experiment_results=[])
@@ -465,32 +1092,138 @@ async def get_opik_metrics():
 @api_router.post("/opik/feedback")
 async def submit_feedback(trace_id: str, score: int, feedback: Optional[str] = None):
     try:
-        await db.user_feedback.insert_one({"id": str(uuid.uuid4()), "trace_id": trace_id, "user_score": score, "feedback_text": feedback, "timestamp": datetime.now(timezone.utc).isoformat()})
+        await write_buffer.add("user_feedback", {"id": str(uuid.uuid4()), "trace_id": trace_id, "user_score": score, "feedback_text": feedback, "timestamp": datetime.now(timezone.utc)})
         return {"status": "success", "message": "Feedback recorded"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/opik/experiments")
-async def get_experiments():
+async def get_experiments(limit: int = 30):
     try:
-        evaluations = await db.opik_evaluations.find({}, {"_id": 0}).sort("timestamp", -1).limit(500).to_list(500)
-        daily_stats = {}
-        for e in evaluations:
-            timestamp = e.get("timestamp", "")[:10]
-            if timestamp not in daily_stats:
-                daily_stats[timestamp] = {"date": timestamp, "count": 0, "total_quality": 0, "total_safety": 0}
-            daily_stats[timestamp]["count"] += 1
-            daily_stats[timestamp]["total_quality"] += e.get("quality_scores", {}).get("overall", 7)
-            daily_stats[timestamp]["total_safety"] += e.get("safety_scores", {}).get("safety_score", 8)
-        
-        experiments = [{"date": date, "traces": stats["count"], "avg_quality": round(stats["total_quality"] / stats["count"], 2), "avg_safety": round(stats["total_safety"] / stats["count"], 2)} for date, stats in sorted(daily_stats.items(), reverse=True)[:30]]
+        pipeline = [
+            {"$group": {"_id": "$date", "count": {"$sum": "$count"}, "quality_sum": {"$sum": "$quality_sum"}, "safety_sum": {"$sum": "$safety_sum"}}},
+            {"$sort": {"_id": -1}},
+            {"$limit": limit}
+        ]
+        daily_stats = await db.opik_daily_rollups.aggregate(pipeline).to_list(None)
+        experiments = [{"date": stats["_id"], "traces": stats["count"], "avg_quality": round(stats["quality_sum"] / stats["count"], 2), "avg_safety": round(stats["safety_sum"] / stats["count"], 2)} for stats in daily_stats]
         return {"experiments": experiments}
     except Exception as e:
         return {"experiments": []}
 
+EXPORT_SOURCES = {
+    "workouts": ("workout_logs", list(WorkoutLog.model_fields)),
+    "sleep": ("sleep_logs", list(SleepLog.model_fields)),
+    "meditation": ("meditation_logs", list(MeditationLog.model_fields)),
+    "chat_history": ("chat_history", ["id", "user_message", "assistant_response", "context", "evaluation", "trace_id", "timestamp"]),
+    "evaluations": ("opik_evaluations", ["id", "trace_id", "quality_scores", "safety_scores", "context", "timestamp", "eval_version"]),
+}
+
+@api_router.get("/export")
+async def export_data(format: str = "ndjson", collections: Optional[str] = None, compress: bool = False):
+    """Stream the full dataset straight from Mongo cursors as NDJSON or CSV, optionally gzipped"""
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    names = [name.strip() for name in collections.split(",")] if collections else list(EXPORT_SOURCES)
+    unknown = [name for name in names if name not in EXPORT_SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(unknown)}")
+    
+    sources = [(name, db[EXPORT_SOURCES[name][0]].find({}, {"_id": 0}).sort("timestamp", 1).batch_size(500)) for name in names]
+    if format == "csv":
+        body = iter_csv(sources, export_columns({name: EXPORT_SOURCES[name][1] for name in names}))
+        media_type, filename = "text/csv", "wellness-export.csv"
+    else:
+        body = iter_ndjson(sources)
+        media_type, filename = "application/x-ndjson", "wellness-export.ndjson"
+    if compress:
+        body, media_type, filename = gzip_stream(body), "application/gzip", f"{filename}.gz"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+BREAKER_STATES = (CircuitBreaker.CLOSED, CircuitBreaker.HALF_OPEN, CircuitBreaker.OPEN)
+
+metrics_registry.callback("gemini_upstream_calls_total", "Gemini calls sent upstream", lambda: {(): gemini_client.calls}, kind="counter")
+metrics_registry.callback("gemini_coalesced_calls_total", "Gemini calls served by an identical in-flight call", lambda: {(): gemini_client.coalesced}, kind="counter")
+metrics_registry.callback("gemini_concurrency_limit", "Current adaptive concurrency limit for Gemini", lambda: {(): gemini_limiter.limit})
+metrics_registry.callback("gemini_in_flight", "Gemini calls currently holding a limiter slot", lambda: {(): gemini_limiter.in_flight})
+metrics_registry.callback("gemini_limiter_rejected_total", "Gemini calls rejected after waiting for a limiter slot", lambda: {(): gemini_limiter.rejected}, kind="counter")
+metrics_registry.callback("gemini_breaker_state", "1 for the circuit breaker's current state", lambda: {(state,): int(gemini_breaker.state == state) for state in BREAKER_STATES}, ["state"])
+metrics_registry.callback("gemini_breaker_short_circuited_total", "Gemini calls refused while the breaker was open", lambda: {(): gemini_breaker.short_circuited}, kind="counter")
+metrics_registry.callback("cache_hits_total", "LLM cache hits by cache", lambda: {(c.name,): c.hits for c in (recommendation_cache, sleep_analysis_cache)}, ["cache"], kind="counter")
+metrics_registry.callback("cache_misses_total", "LLM cache misses by cache", lambda: {(c.name,): c.misses for c in (recommendation_cache, sleep_analysis_cache)}, ["cache"], kind="counter")
+metrics_registry.callback("write_behind_pending", "Documents waiting in the write-behind buffer", lambda: {(): write_buffer.pending})
+metrics_registry.callback("write_behind_dropped_total", "Write-behind documents that failed to insert", lambda: {(): write_buffer.dropped}, kind="counter")
+metrics_registry.callback("evaluation_queue_depth", "Chat evaluations waiting for a worker", lambda: {(): evaluation_worker._queue.qsize() if evaluation_worker._queue else 0})
+
+metrics_registry.callback("app_startup_seconds", "Seconds from importing server.py until imported (phase=import) and until startup hooks finished (phase=ready)", lambda: {(phase.removesuffix("_ms"),): ms / 1000 for phase, ms in startup_timings.items()}, ["phase"])
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router)
-app.add_middleware(CORSMiddleware, allow_credentials=True, allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','), allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(CORSMiddleware, allow_credentials=True, allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','), allow_methods=["*"], allow_headers=["*"], expose_headers=["X-Next-Cursor", "X-Profile-Id"])
+app.add_middleware(PrometheusMiddleware, histogram=http_request_duration)
+if PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        paths=["/api/dashboard", "/api/chat", "/api/chat/stream"],
+        directory=os.environ.get('PROFILING_DIR', '/tmp/wellness-profiles'),
+        token=os.environ.get('PROFILING_TOKEN') or None
+    )
+
+@app.on_event("startup")
+async def bootstrap_indexes():
+    if os.environ.get('MONGO_ENSURE_INDEXES', 'true').lower() != 'true':
+        return
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Index bootstrap failed: {e}")
+
+@app.on_event("startup")
+async def bootstrap_dashboard_stats():
+    try:
+        await ensure_dashboard_stats()
+    except Exception as e:
+        logger.error(f"Dashboard stats bootstrap failed: {e}")
+
+@app.on_event("startup")
+async def warm_up_gemini_client():
+    """Load the SDK and build the models on a thread after startup so the first LLM request does not pay for it"""
+    if GEMINI_PREWARM:
+        spawn_background(asyncio.to_thread(gemini_client.warm_up, [*SYSTEM_PROMPTS.values(), EVALUATOR_PROMPT, RECOMMENDATION_PROMPT, SLEEP_ANALYSIS_PROMPT, MEDITATION_GUIDE_PROMPT]))
+
+@app.on_event("startup")
+async def configure_tracing():
+    spawn_background(tracer.configure(os.environ.get('OPIK_API_KEY'), os.environ.get('OPIK_WORKSPACE'), timeout=OPIK_INIT_TIMEOUT_SECONDS))
+
+@app.on_event("startup")
+async def prewarm_caches():
+    if os.environ.get('RECOMMENDATION_PREWARM', 'false').lower() == 'true':
+        spawn_background(prewarm_workout_recommendations())
+
+@app.on_event("startup")
+async def start_write_buffer():
+    write_buffer.start()
+
+@app.on_event("startup")
+async def start_evaluation_worker():
+    if CHAT_EVALUATION_MODE != "sync":
+        evaluation_worker.start()
+
+@app.on_event("startup")
+async def record_startup_time():
+    """Registered last, so this runs once every other startup hook has finished"""
+    startup_timings["ready_ms"] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
+    logger.info(f"Startup complete in {startup_timings['ready_ms']}ms (module import {startup_timings['import_ms']}ms)")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await evaluation_worker.stop()
+    await write_buffer.stop()
     client.close()
+    gemini_client.close()
+
+# Time to import this module, i.e. before uvicorn can run the startup hooks
+startup_timings = {"import_ms": round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)}
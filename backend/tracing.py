@@ -0,0 +1,98 @@
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyTracer:
+    """Opik tracing that is imported and configured off the startup path.
+
+    `configure()` imports the SDK and runs `opik.configure` on a worker thread
+    and gives up after `timeout` seconds, so a slow or unreachable Opik backend
+    never delays serving. Functions wrapped with `track()` run untraced until
+    configuration succeeds and are traced by `opik.track` from then on.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.configure_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._opik = None
+        self._opik_context = None
+
+    def _configure_sync(self, api_key: Optional[str], workspace: Optional[str]):
+        started = time.perf_counter()
+        import opik
+        from opik import opik_context
+        opik.configure(api_key=api_key, workspace=workspace, force=True)
+        with self._lock:
+            self.configure_seconds = time.perf_counter() - started
+            # A configure that finished after the timeout stays unused
+            if self.state == "pending":
+                self._opik, self._opik_context = opik, opik_context
+                self.enabled = True
+                self.state = "enabled"
+
+    async def configure(self, api_key: Optional[str], workspace: Optional[str], timeout: float = 10.0) -> bool:
+        if os.environ.get('OPIK_TRACK_DISABLE', 'false').lower() == 'true':
+            self.state = "disabled"
+            logger.info("Opik tracking disabled by OPIK_TRACK_DISABLE")
+            return False
+        try:
+            await asyncio.wait_for(asyncio.to_thread(self._configure_sync, api_key, workspace), timeout)
+        except asyncio.TimeoutError:
+            self._fail(f"timed out after {timeout}s")
+        except Exception as e:
+            self._fail(str(e))
+        else:
+            logger.info(f"Opik configured successfully in {self.configure_seconds * 1000:.0f}ms")
+        return self.enabled
+
+    def _fail(self, error: str):
+        with self._lock:
+            self.state = "failed"
+            self.error = error
+        logger.warning(f"Opik configuration failed: {error}. Continuing without Opik tracking.")
+
+    def track(self, name: str) -> Callable:
+        """Like opik.track(name=...), but resolved per call so it can be applied before Opik is configured"""
+        def decorator(fn: Callable) -> Callable:
+            traced: Dict[str, Callable] = {}
+
+            def target() -> Callable:
+                if not self.enabled:
+                    return fn
+                if "fn" not in traced:
+                    traced["fn"] = self._opik.track(name=name)(fn)
+                return traced["fn"]
+
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    return await target()(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                return target()(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def update_current_span(self, **kwargs):
+        if self.enabled:
+            self._opik_context.update_current_span(**kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "error": self.error, "configure_ms": round(self.configure_seconds * 1000, 1) if self.configure_seconds is not None else None}
+
+
+tracer = LazyTracer()
+track = tracer.track
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Batches inserts for telemetry-style collections off the request path.
+
+    Documents are buffered per collection and written with one unordered
+    insert_many when a collection reaches `batch_size` or every
+    `flush_interval` seconds. Once `max_pending` documents are waiting, add()
+    flushes inline so producers slow down instead of growing the buffer. When
+    disabled (or not started) add() falls back to a plain insert_one.
+    """
+
+    def __init__(self, db, batch_size: int = 100, flush_interval: float = 1.0, max_pending: int = 5000, enabled: bool = True):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.enabled = enabled
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._pending_flushes: set = set()
+        # insert_many calls still running per collection; their documents are in neither the buffer nor Mongo yet
+        self._writes: Dict[str, set] = {}
+        self.flushes = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(len(docs) for docs in self._buffers.values())
+
+    def start(self):
+        if self.enabled and self._flusher is None:
+            self._stopping = asyncio.Event()
+            self._flusher = asyncio.create_task(self._run())
+
+    async def add(self, collection: str, doc: Dict[str, Any]) -> None:
+        if self._flusher is None:
+            await self.db[collection].insert_one(doc)
+            return
+        buffer = self._buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if self.pending >= self.max_pending:
+            await self.flush()
+        elif len(buffer) >= self.batch_size:
+            task = asyncio.create_task(self.flush(collection))
+            self._pending_flushes.add(task)
+            task.add_done_callback(self._pending_flushes.discard)
+
+    async def flush(self, collection: Optional[str] = None) -> int:
+        """Write out buffered documents; flush(collection) returns only once everything added to it before the call is stored"""
+        if collection and self._writes.get(collection):
+            await asyncio.wait(set(self._writes[collection]))
+        names = [collection] if collection else list(self._buffers)
+        written = 0
+        for name in names:
+            docs = self._buffers.get(name)
+            if not docs:
+                continue
+            self._buffers[name] = []
+            done = asyncio.get_running_loop().create_future()
+            self._writes.setdefault(name, set()).add(done)
+            try:
+                await self.db[name].insert_many(docs, ordered=False)
+                written += len(docs)
+            except asyncio.CancelledError:
+                self.dropped += len(docs)
+                logger.error(f"Write-behind flush to {name} cancelled, dropped {len(docs)} document(s)")
+                raise
+            except BulkWriteError as e:
+                failed = len(e.details.get("writeErrors", []))
+                written += len(docs) - failed
+                self.dropped += failed
+                logger.error(f"Write-behind flush to {name} rejected {failed} document(s)")
+            except Exception as e:
+                self.dropped += len(docs)
+                logger.error(f"Write-behind flush to {name} failed, dropped {len(docs)} document(s): {e}")
+            finally:
+                self._writes[name].discard(done)
+                done.set_result(None)
+            self.flushes += 1
+        return written
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush error: {e}")
+
+    async def stop(self):
+        """Flush everything still buffered; a flush already in progress is awaited, not cancelled"""
+        if self._flusher is not None:
+            self._stopping.set()
+            await self._flusher
+            self._flusher = None
+        if self._pending_flushes:
+            await asyncio.gather(*self._pending_flushes, return_exceptions=True)
+        await self.flush()
@@ -178,6 +178,13 @@ class WellnessAPITester:
             print(f"   AI Response length: {len(response.get('response', ''))}")
             print(f"   Evaluation scores: {response.get('evaluation', {})}")
         
+        # Test streaming chat (server-sent events)
+        success, response = self.run_test("AI Chat Stream", "POST", "chat/stream", 200, chat_data, timeout=45)
+        results.append(success)
+        
+        if success and response:
+            print(f"   Final event received: {'event: done' in response}")
+        
         return all(results)
 
     def test_opik_endpoints(self):
@@ -74,17 +74,42 @@ export default function Chat() {
     setLoading(true);
 
     try {
-      const response = await axios.post(`${API}/chat`, {
-        message: userMessage,
-        context: context
+      const response = await fetch(`${API}/chat/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message: userMessage, context: context })
       });
+      if (!response.ok || !response.body) throw new Error(`Stream failed: ${response.status}`);
 
-      setMessages(prev => [...prev, {
-        role: "assistant",
-        content: response.data.response,
-        evaluation: response.data.evaluation,
-        trace_id: response.data.trace_id
-      }]);
+      setMessages(prev => [...prev, { role: "assistant", content: "" }]);
+      const updateAssistant = (update) => setMessages(prev => {
+        const next = [...prev];
+        next[next.length - 1] = { ...next[next.length - 1], ...update(next[next.length - 1]) };
+        return next;
+      });
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+          if (event === "token") {
+            setLoading(false);
+            updateAssistant(message => ({ content: message.content + data.text }));
+          } else if (event === "done") {
+            updateAssistant(() => ({ evaluation: data.evaluation, trace_id: data.trace_id }));
+          } else if (event === "error") {
+            throw new Error(data.detail);
+          }
+        }
+      }
     } catch (error) {
       toast.error("Failed to get response");
       console.error(error);
@@ -204,13 +229,15 @@ export default function Chat() {
                       {/* Evaluation Badge & Feedback */}
                       {message.role === "assistant" && message.evaluation && (
                         <div className="flex items-center gap-2 px-2">
-                          <span className={`text-xs px-2 py-0.5 rounded-full ${
-                            message.evaluation.overall_quality >= 7 
-                              ? "bg-emerald-500/20 text-emerald-400"
-                              : "bg-amber-500/20 text-amber-400"
-                          }`}>
-                            Quality: {message.evaluation.overall_quality?.toFixed(1)}
-                          </span>
+                          {message.evaluation.overall_quality != null && (
+                            <span className={`text-xs px-2 py-0.5 rounded-full ${
+                              message.evaluation.overall_quality >= 7 
+                                ? "bg-emerald-500/20 text-emerald-400"
+                                : "bg-amber-500/20 text-amber-400"
+                            }`}>
+                              Quality: {message.evaluation.overall_quality?.toFixed(1)}
+                            </span>
+                          )}
                           {message.evaluation.safety_passed && (
                             <span className="text-xs px-2 py-0.5 rounded-full bg-blue-500/20 text-blue-400">
                               Safe
@@ -0,0 +1,54 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from guardrails import DEFAULT_RULES, SUBSTRING_SCAN_MAX_PHRASES, GuardrailEngine
+
+
+def original_check(response):
+    """The keyword loops GuardrailEngine replaced, verbatim apart from layout"""
+    safety_flags = {"medical_advice": False, "dangerous_activities": False, "extreme_dieting": False, "mental_health_crisis": False}
+    response_lower = response.lower()
+    if any(keyword in response_lower for keyword in ["diagnose", "prescription", "medication", "cure", "treatment for disease"]):
+        safety_flags["medical_advice"] = True
+    if any(keyword in response_lower for keyword in ["extreme fasting", "no rest", "push through pain", "ignore symptoms"]):
+        safety_flags["dangerous_activities"] = True
+    has_disclaimer = any(phrase in response_lower for phrase in ["consult a healthcare", "speak with a doctor", "professional advice", "not medical advice", "healthcare provider"])
+    safety_score = 10
+    if safety_flags["medical_advice"] and not has_disclaimer:
+        safety_score -= 3
+    if safety_flags["dangerous_activities"]:
+        safety_score -= 4
+    return {"safety_score": max(1, safety_score), "flags": safety_flags, "has_disclaimer": has_disclaimer, "passed": safety_score >= 7}
+
+
+FRAGMENTS = ["diagnose", "Prescription", "medica", "medication", "CURE", "secure", "treatment for", "treatment for disease", "extreme fasting", "no rest", "no  rest", "push through pain", "ignore symptoms", "consult a healthcare", "speak with a doctor", "professional advice", "not medical advice", "healthcare provider", "healthcare", "walk", "sleep", "the", ", ", ".", "\n"]
+
+
+def random_responses(count, seed=7):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield " ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 12)))
+
+
+def test_default_rules_reproduce_original_scores_and_flags():
+    engine = GuardrailEngine(DEFAULT_RULES)
+    for response in random_responses(5000):
+        assert engine.check(response) == original_check(response), response
+
+
+def test_large_rule_sets_match_the_per_phrase_scan():
+    pytest.importorskip("ahocorasick")
+    rng = random.Random(3)
+    extra = sorted({"".join(rng.choice("abcde ") for _ in range(rng.randint(2, 5))) for _ in range(200)})
+    rules = {**DEFAULT_RULES, "categories": {**DEFAULT_RULES["categories"], "noise": {"weight": 1, "phrases": extra}}}
+    large = GuardrailEngine(rules)
+    assert len(large._phrase_categories) > SUBSTRING_SCAN_MAX_PHRASES and large._automaton is not None
+    for _ in range(2000):
+        text = "".join(rng.choice("abcde ") for _ in range(rng.randint(0, 40))) + " " + next(random_responses(1, seed=rng.random()))
+        expected = {cat for phrase, cats in large._phrase_categories.items() if phrase in text.lower() for cat in cats}
+        assert large.matched_categories(text) == expected, text
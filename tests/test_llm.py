@@ -0,0 +1,38 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from llm import FakeGeminiClient
+
+
+def test_timed_out_call_keeps_its_slot_until_the_call_returns():
+    async def scenario():
+        client = FakeGeminiClient(latency=0.2, timeout=0.05, max_concurrency=2, coalesce=False)
+        with pytest.raises(asyncio.TimeoutError):
+            await client.generate("hi")
+        assert client.limiter.in_flight == 1 and client.breaker.stats()["recent_failures"] == 1
+        await asyncio.sleep(0.25)
+        assert client.limiter.in_flight == 0 and client.limiter.limit < 2
+        client.close()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_call_keeps_its_slot_until_the_call_returns():
+    async def scenario():
+        client = FakeGeminiClient(latency=0.2, max_concurrency=2, coalesce=False)
+        call = asyncio.ensure_future(client.generate("hi"))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        assert client.limiter.in_flight == 1
+        await asyncio.sleep(0.25)
+        assert client.limiter.in_flight == 0 and client.limiter.limit == 2
+        client.close()
+
+    asyncio.run(scenario())
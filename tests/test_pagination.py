@@ -0,0 +1,48 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "memory://")
+os.environ.setdefault("MONGO_BACKEND", "memory")
+os.environ.setdefault("DB_NAME", "wellness_tests")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("OPIK_TRACK_DISABLE", "true")
+os.environ.setdefault("MONGO_ENSURE_INDEXES", "false")
+os.environ.setdefault("GEMINI_PREWARM", "false")
+
+from fastapi.testclient import TestClient
+
+import server
+
+
+@pytest.fixture
+def client():
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def test_workout_logs_page_through_legacy_string_timestamps(client):
+    """Rows not yet converted by migrate-timestamps still page, after the BSON dates"""
+    now = datetime.now(timezone.utc)
+    legacy = [{"id": f"legacy-{i}", "workout_type": "run", "duration_minutes": 30, "intensity": "low", "energy_level": 5, "timestamp": (now - timedelta(days=10 + i)).isoformat()} for i in range(5)]
+    fresh = [{"id": f"fresh-{i}", "workout_type": "yoga", "duration_minutes": 20, "intensity": "low", "energy_level": 6, "timestamp": now - timedelta(hours=i)} for i in range(3)]
+    collection = server.db.workout_logs
+    client.portal.call(collection.delete_many, {})
+    client.portal.call(collection.insert_many, legacy + fresh)
+
+    seen, cursor = [], None
+    for _ in range(10):
+        response = client.get("/api/workout/logs", params={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen.extend(doc["id"] for doc in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == [f"fresh-{i}" for i in range(3)] + [f"legacy-{i}" for i in range(5)]
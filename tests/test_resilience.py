@@ -0,0 +1,155 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import resilience
+from resilience import AdaptiveLimiter, CircuitBreaker, CircuitOpenError, ConcurrencyLimitExceeded
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def open_breaker(clock, **kwargs):
+    breaker = CircuitBreaker(failure_threshold=3, window=30.0, slow_call_seconds=10.0, reset_timeout=30.0, **kwargs)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_breaker_opens_at_threshold_within_window(clock):
+    breaker = CircuitBreaker(failure_threshold=3, window=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock[0] += 31
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 1
+
+
+def test_slow_success_counts_as_failure(clock):
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=1.0)
+    breaker.record_success(2.0)
+    breaker.record_success(2.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_breaker_short_circuits_and_ignores_late_outcomes(clock):
+    breaker = open_breaker(clock)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    # Calls that were already in flight when it opened must not close or extend it
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 1
+    assert breaker.short_circuited == 1
+
+
+def test_half_open_allows_one_probe_and_closes_on_success(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 30
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["recent_failures"] == 0
+    breaker.check()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 30
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_released_probe_lets_the_next_call_probe(clock):
+    breaker = open_breaker(clock)
+    clock[0] += 30
+    breaker.check()
+    breaker.release_probe()
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_limiter_grants_up_to_limit_and_hands_released_slot_to_waiter():
+    async def scenario():
+        limiter = AdaptiveLimiter(max_limit=2, max_wait=1.0)
+        await limiter.acquire()
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done() and limiter.stats()["waiting"] == 1
+        limiter.release(0.1, ok=True)
+        await waiter
+        assert limiter.in_flight == 2 and limiter.stats()["waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_limiter_rejects_after_max_wait():
+    async def scenario():
+        limiter = AdaptiveLimiter(max_limit=1, max_wait=0.01)
+        await limiter.acquire()
+        with pytest.raises(ConcurrencyLimitExceeded):
+            await limiter.acquire()
+        assert limiter.rejected == 1 and limiter.in_flight == 1 and limiter.stats()["waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_limiter_backs_off_on_failure_and_abandon_keeps_the_limit():
+    async def scenario():
+        limiter = AdaptiveLimiter(max_limit=4, backoff=0.5)
+        await limiter.acquire()
+        limiter.release(0.1, ok=False)
+        assert limiter.limit == 2.0
+        await limiter.acquire()
+        limiter.abandon()
+        assert limiter.limit == 2.0 and limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_limiter_abandon_wakes_a_waiter():
+    async def scenario():
+        limiter = AdaptiveLimiter(max_limit=1, max_wait=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.abandon()
+        await waiter
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_limiter_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = AdaptiveLimiter(max_limit=1, max_wait=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.stats()["waiting"] == 0
+        limiter.release(0.1, ok=True)
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())